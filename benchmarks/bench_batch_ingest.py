@@ -0,0 +1,81 @@
+"""
+Micro-benchmark: purchases/sec for one-by-one create_purchase versus the
+batched PurchaseService.create_purchases used by POST /purchase/batch.
+
+Usage (from the repository root):
+    python benchmarks/bench_batch_ingest.py [--url sqlite:///bench.db] [-n 20000] [--chunk-size 1000]
+
+WARNING: drops and recreates every application table in --url, which
+may not point at the application's DATABASE_URL.
+"""
+import argparse
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.models.base import Base
+from shared.models.product import Product
+from cashier.services.purchase_service import PurchaseService
+from scratch_db import refuse_application_database
+
+ITEMS = ["milk", "bread", "eggs", "apples", "cheese"]
+
+
+def make_purchases(n, customers):
+    rng = random.Random(42)
+    return [
+        {
+            "supermarket_id": f"SMKT00{rng.randint(1, 3)}",
+            "user_id": rng.choice(customers) if rng.random() < 0.7 else None,
+            "items": rng.sample(ITEMS, rng.randint(1, 4)),
+        }
+        for _ in range(n)
+    ]
+
+
+def one_by_one(db, purchases, chunk_size):
+    for p in purchases:
+        PurchaseService.create_purchase(db, p["supermarket_id"], p["user_id"], p["items"])
+
+
+def batched(db, purchases, chunk_size):
+    PurchaseService.create_purchases(db, purchases, chunk_size=chunk_size)
+
+
+def run(label, ingest, Session, purchases, chunk_size):
+    with Session() as db:
+        start = time.perf_counter()
+        ingest(db, purchases, chunk_size)
+        elapsed = time.perf_counter() - start
+    print(f"{label:<11} n={len(purchases)}  {elapsed:.2f} s  {len(purchases) / elapsed:,.0f} purchases/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///:memory:", help="scratch database (its tables are dropped)")
+    parser.add_argument("-n", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    engine = create_engine(refuse_application_database(args.url), echo=False)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as db:
+        db.add_all([Product(product_name=name, unit_price=1.0) for name in ITEMS])
+        db.commit()
+
+    customers = [f"bench-{i}" for i in range(args.n // 10 or 1)]
+    # One-by-one is much slower; a tenth of the rows is enough for a rate
+    run("one-by-one", one_by_one, Session, make_purchases(args.n // 10, customers), args.chunk_size)
+    run("batch", batched, Session, make_purchases(args.n, customers), args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: cost of per-item debug logging in a top_products-style counting loop.
+
+Counts product occurrences over a synthetic purchases set with DEBUG disabled:
+
+  fstring  logger.debug(f"...{item}") per item (the old top_products loop)
+  lazy     logger.debug("...%s", item) per item
+  sampled  no per-item logging, RowProgress summary every N rows
+
+Usage (from the repository root):
+    python benchmarks/bench_logging_overhead.py [--rows 2000000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.log_utils import RowProgress
+
+PRODUCTS = ["milk", "bread", "eggs", "chicken", "apples", "toilet paper",
+            "cereal", "cheese", "yogurt", "orange juice"]
+
+logger = logging.getLogger("bench.top_products")
+
+
+def synthetic_rows(n, seed=42):
+    rnd = random.Random(seed)
+    baskets = [",".join(rnd.sample(PRODUCTS, k=rnd.randint(1, 5))) for _ in range(1000)]
+    return [(baskets[i % len(baskets)],) for i in range(n)]
+
+
+def count_fstring(rows):
+    counts = Counter()
+    for r in rows:
+        for it in r[0].split(","):
+            item = it.strip()
+            logger.debug(f"Counting product occurrence: {item}")
+            if item:
+                counts[item] += 1
+    return counts
+
+
+def count_lazy(rows):
+    counts = Counter()
+    for r in rows:
+        for it in r[0].split(","):
+            item = it.strip()
+            logger.debug("Counting product occurrence: %s", item)
+            if item:
+                counts[item] += 1
+    return counts
+
+
+def count_sampled(rows):
+    counts = Counter()
+    progress = RowProgress(logger, "top_products")
+    for r in rows:
+        for it in r[0].split(","):
+            item = it.strip()
+            if item:
+                counts[item] += 1
+        progress.add()
+    progress.done()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    rows = synthetic_rows(args.rows)
+    items = sum(len(r[0].split(",")) for r in rows)
+    print(f"rows={len(rows)} items={items} (DEBUG disabled)")
+
+    expected = None
+    for label, fn in (("fstring", count_fstring), ("lazy", count_lazy), ("sampled", count_sampled)):
+        start = time.perf_counter()
+        counts = fn(rows)
+        elapsed = time.perf_counter() - start
+        expected = expected or counts
+        assert counts == expected
+        print(f"{label:<8} {elapsed * 1000:9.1f} ms  {len(rows) / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
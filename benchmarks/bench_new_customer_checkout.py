@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: new-customer checkout latency with and without the users probe.
+
+"before" runs PurchaseService.create_purchase with the old user resolution
+(SELECT users for each fresh uuid4, then an ORM insert); "after" is the
+current one, which inserts the user with ON CONFLICT DO NOTHING and never
+probes. Both share the rest of the checkout write path.
+
+Usage (from the repository root):
+    python benchmarks/bench_new_customer_checkout.py [--url sqlite:///bench.db] [-n 2000]
+
+WARNING: drops and recreates every application table in --url, which
+may not point at the application's DATABASE_URL.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from shared.models.base import Base
+from shared.models.product import Product
+from shared.models.user import User
+from cashier.services.purchase_service import PurchaseService
+from scratch_db import refuse_application_database
+
+ITEMS = ["milk", "bread", "eggs"]
+
+
+class LegacyPurchaseService(PurchaseService):
+    """create_purchase with the old user resolution swapped back in.
+
+    Everything else (pricing, purchase_items, summary counters, the single
+    commit) is the current write path, so the two runs differ only by the
+    users probe.
+    """
+
+    @classmethod
+    def _get_or_create_user(cls, db, user_id=None):
+        while True:
+            new_id = str(uuid.uuid4())
+            if not db.query(User).filter(User.user_id == new_id).first():
+                break
+        db.add(User(user_id=new_id))
+        return new_id, True
+
+
+def legacy_checkout(db, supermarket_id, items):
+    LegacyPurchaseService.create_purchase(db, supermarket_id, None, items)
+
+
+def current_checkout(db, supermarket_id, items):
+    PurchaseService.create_purchase(db, supermarket_id, None, items)
+
+
+def run(label, checkout, Session, n, statements):
+    db = Session()
+    timings = []
+    statements.clear()
+    try:
+        for _ in range(n):
+            start = time.perf_counter()
+            checkout(db, "SMKT001", ITEMS)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        db.close()
+    print(f"{label:<8} n={n}  mean={statistics.mean(timings):.3f} ms  "
+          f"p50={statistics.median(timings):.3f} ms  "
+          f"p95={statistics.quantiles(timings, n=20)[18]:.3f} ms  "
+          f"queries/checkout={len(statements) / n:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///:memory:", help="scratch database (its tables are dropped)")
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine(refuse_application_database(args.url), echo=False)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as db:
+        db.add_all([Product(product_name=name, unit_price=1.0) for name in ITEMS])
+        db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *a: statements.append(statement))
+
+    run("before", legacy_checkout, Session, args.n, statements)
+    run("after", current_checkout, Session, args.n, statements)
+
+
+if __name__ == "__main__":
+    main()
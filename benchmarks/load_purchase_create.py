@@ -0,0 +1,68 @@
+"""
+Load test: requests/sec for POST /purchase/create against a running cashier.
+
+Start the cashier once per mode and run this script against each:
+
+    uvicorn cashier.main:app --port 8000 --workers 1                # sync handlers
+    DB_ASYNC=1 uvicorn cashier.main:app --port 8000 --workers 1     # async handlers
+    python benchmarks/load_purchase_create.py --url http://localhost:8000 -c 200 -d 30
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client, url, products, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        body = {
+            "supermarket_id": f"SMKT00{random.randint(1, 3)}",
+            "user_id": None,
+            "items_list": random.sample(products, k=min(3, len(products))),
+        }
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json=body)
+            # 202: accepted into the write-behind queue (PURCHASE_WRITE_BEHIND)
+            if response.status_code not in (200, 202):
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("-d", "--duration", type=float, default=20.0, help="seconds")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        products = [p["name"] for p in (await client.get("/product/all")).json()["products"]]
+        latencies, errors = [], []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*[
+            worker(client, "/purchase/create", products, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    print(f"concurrency={args.concurrency} duration={elapsed:.1f}s")
+    print(f"requests ok={len(latencies)} errors={len(errors)}  throughput={len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        print(f"latency p50={statistics.median(latencies):.1f} ms  "
+              f"p95={statistics.quantiles(latencies, n=20)[18]:.1f} ms  max={max(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+"""
+Guard for benchmarks that drop and recreate the application tables.
+
+Imported by the benchmark scripts in this directory (run from the
+repository root, which puts benchmarks/ on sys.path).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.engine import make_url
+
+from shared.settings import DatabaseSettings, settings
+
+
+def _identity(url):
+    if url.get_backend_name() == "sqlite":
+        database = url.database or ""
+        return "sqlite", None, os.path.abspath(database) if database not in ("", ":memory:") else ":memory:"
+    # An omitted port is the server's default, so postgresql://h/db and
+    # postgresql://h:5432/db are the same database
+    return (url.host or "localhost").lower(), url.port or 5432, url.database
+
+
+def refuse_application_database(url):
+    """The URL as a SQLAlchemy URL, exiting if it is the application's DATABASE_URL"""
+    target = make_url(DatabaseSettings({"DATABASE_URL": url}).url)
+    if _identity(target) == _identity(make_url(settings.url)):
+        sys.exit("refusing to run against the application database (DATABASE_URL); use a scratch database")
+    return target
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from cashier.database import AsyncSessionLocal
+from cashier.services.product_catalog import ProductCatalog, CATALOG_CACHE_CONTROL
+from cashier.controllers.product_controller import get_catalog_stats, invalidate_catalog
+
+router = APIRouter(
+    prefix="/product",
+    tags=["product"]
+)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@router.get("/all")
+async def get_all_products(request: Request, db: AsyncSession = Depends(get_db)):
+    """Get all products from the cached, pre-serialized product catalog"""
+    try:
+        snapshot = await db.run_sync(ProductCatalog.snapshot)
+        return snapshot.response(request, CATALOG_CACHE_CONTROL)
+    except Exception as e:
+        raise Exception(f"Error fetching products: {str(e)}")
+
+
+# The catalog stats/invalidate endpoints never touch the database
+router.add_api_route("/catalog/stats", get_catalog_stats, methods=["GET"])
+router.add_api_route("/catalog/invalidate", invalidate_catalog, methods=["POST"])
@@ -0,0 +1,57 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from cashier.database import AsyncSessionLocal
+from cashier.schemas.purchase_in import PurchaseIn
+from cashier.services.purchase_service import PurchaseService
+from cashier.services.write_behind import WriteBehindQueue
+from cashier.controllers.purchase_controller import (
+    checkout_errors, checkout_request, checkout_response, customers_page, get_write_behind_stats, record_batch,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/purchase",
+    tags=["purchase"]
+)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@router.get("/customers")
+async def search_customers(
+    q: str = Query("", max_length=64, description="Customer id prefix"),
+    after: Optional[str] = Query(None, description="Cursor: next_after from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    """Search customers by id prefix, one keyset-paginated page at a time"""
+    return await db.run_sync(customers_page, q, after, limit)
+
+
+@router.post("/create")
+async def create_purchase(p: PurchaseIn, response: Response,
+                          idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+                          db: AsyncSession = Depends(get_db)):
+    request = checkout_request(p, idempotency_key)
+    with checkout_errors():
+        if WriteBehindQueue.enabled:
+            result = await WriteBehindQueue.submit_async(db, **request)
+        else:
+            result = await db.run_sync(PurchaseService.checkout, **request)
+    return checkout_response(result, response)
+
+
+@router.post("/batch")
+async def create_purchases(purchases: List[PurchaseIn], db: AsyncSession = Depends(get_db)):
+    """Record many purchases in one request; results are reported per purchase"""
+    return await db.run_sync(record_batch, purchases)
+
+
+# The write-behind stats endpoint never touches the database
+router.add_api_route("/write-behind/stats", get_write_behind_stats, methods=["GET"])
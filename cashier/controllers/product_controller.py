@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from sqlalchemy.orm import Session
 from cashier.database import SessionLocal
-from cashier.models.product import Product
+from cashier.services import product_catalog
+from cashier.services.product_catalog import ProductCatalog, CATALOG_CACHE_CONTROL
 
 router = APIRouter(
     prefix="/product",
@@ -18,19 +21,37 @@ def get_db():
 
 
 @router.get("/all")
-def get_all_products(db: Session = Depends(get_db)):
-    """Get all products from database"""
+def get_all_products(request: Request, db: Session = Depends(get_db)):
+    """Get all products from the cached product catalog.
+
+    Served from a pre-serialized, pre-compressed snapshot with an ETag, so
+    terminals revalidating an unchanged catalog get a 304.
+    """
     try:
-        products = db.query(Product).all()
-        return {
-            "products": [
-                {
-                    "name": p.product_name,
-                    "price": float(p.unit_price)
-                }
-                for p in products
-            ]
-        }
+        return ProductCatalog.snapshot(db).response(request, CATALOG_CACHE_CONTROL)
     except Exception as e:
         raise Exception(f"Error fetching products: {str(e)}")
 
+
+@router.get("/catalog/stats")
+def get_catalog_stats():
+    """Expose product catalog cache hit/miss/refresh counters"""
+    return ProductCatalog.stats()
+
+
+@router.post("/catalog/invalidate")
+def invalidate_catalog(admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Force the product catalog to be reloaded on the next lookup.
+
+    Only clears the cache of the worker process that serves the request;
+    the other workers pick up price changes when their TTL expires.
+    Requires X-Admin-Token to match PRODUCT_CATALOG_ADMIN_TOKEN and is
+    disabled while that is unset.
+    """
+    expected = product_catalog.PRODUCT_CATALOG_ADMIN_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if admin_token is None or not hmac.compare_digest(admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    ProductCatalog.invalidate()
+    return {"invalidated": True}
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+from contextlib import contextmanager
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from cashier.database import SessionLocal
 from cashier.schemas.purchase_in import PurchaseIn
 from cashier.services.purchase_service import PurchaseService
+from cashier.services.write_behind import WriteBehindQueue, QueueFull
+from cashier.services.idempotency_cache import IdempotencyKeyReused
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Largest number of purchases accepted by one POST /purchase/batch
+PURCHASE_BATCH_MAX = int(os.getenv("PURCHASE_BATCH_MAX", "10000"))
+
 router = APIRouter(
     prefix="/purchase",
     tags=["purchase"]
@@ -21,38 +29,113 @@ def get_db():
         db.close()
 
 
-@router.get("/customers")
-def get_all_customers(db: Session = Depends(get_db)):
-    """Get all existing customers from database"""
+# Handler bodies shared with async_purchase_controller, which runs the
+# database ones on its AsyncSession through run_sync
+
+
+def customers_page(db: Session, q: str, after: Optional[str], limit: int):
     logger.info("Received request: GET /purchase/customers")
     try:
-        customers = PurchaseService.get_all_customers(db)
-        logger.info(f"Returning {len(customers)} customers")
-        return {"customers": customers}
+        customers, next_after = PurchaseService.search_customers(db, q, after, limit)
+        logger.info("Returning %s customers", len(customers))
+        return {"customers": customers, "next_after": next_after}
     except Exception as e:
         logger.exception("Error while fetching customers")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/create")
-def create_purchase(p: PurchaseIn, db: Session = Depends(get_db)):
-    logger.info(f"Received request: POST /purchase/create for supermarket_id={p.supermarket_id}, user_id={p.user_id}")
-    try:
-        purchase, is_new, user_id = PurchaseService.create_purchase(
-            db=db,
-            supermarket_id=p.supermarket_id,
-            user_id=p.user_id,
-            items=p.items_list,
-        )
-        logger.info(f"Purchase created successfully with ID={purchase.id}, user_id={user_id}, is_new={is_new}")
-
-        return {
-            "purchase_id": purchase.id,
-            "user_id": user_id,
-            "is_new": is_new,
-            "total_amount": purchase.total_amount
-        }
+def checkout_request(p: PurchaseIn, idempotency_key: Optional[str]):
+    """Keyword arguments for checkout / WriteBehindQueue.submit"""
+    logger.info("Received request: POST /purchase/create for supermarket_id=%s, user_id=%s", p.supermarket_id, p.user_id)
+    return {
+        "supermarket_id": p.supermarket_id,
+        "user_id": p.user_id,
+        "items": p.items_list,
+        "idempotency_key": resolve_idempotency_key(p, idempotency_key),
+    }
+
 
+@contextmanager
+def checkout_errors():
+    """Map checkout failures to their HTTP responses"""
+    try:
+        yield
+    except IdempotencyKeyReused as e:
+        logger.warning("Refusing purchase: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
-        logger.error(f"Validation error while creating purchase: {e}")
+        logger.error("Validation error while creating purchase: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
+    except QueueFull as e:
+        logger.warning("Write-behind queue full, refusing purchase: %s", e)
+        raise HTTPException(status_code=503, detail="Too many purchases waiting to be stored, retry shortly",
+                            headers={"Retry-After": "1"})
+
+
+def checkout_response(result: dict, response: Response):
+    # Write-behind mode answers once the sale is in the local log (202) and
+    # writes it to the database in the next group commit
+    if result.get("queued"):
+        response.status_code = 202
+    logger.info("Purchase %s with ID=%s, user_id=%s, is_new=%s",
+                "replayed" if result["replayed"] else "created", result["purchase_id"], result["user_id"], result["is_new"])
+    return result
+
+
+def resolve_idempotency_key(p: PurchaseIn, header_key: Optional[str]):
+    """The Idempotency-Key header or the body's client_purchase_id, which must agree if both are sent"""
+    if header_key and p.client_purchase_id and header_key != p.client_purchase_id:
+        raise HTTPException(status_code=400, detail="Idempotency-Key and client_purchase_id differ")
+    return header_key or p.client_purchase_id
+
+
+def record_batch(db: Session, purchases: List[PurchaseIn]):
+    logger.info("Received request: POST /purchase/batch with %s purchases", len(purchases))
+    if len(purchases) > PURCHASE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {PURCHASE_BATCH_MAX} purchases per batch")
+    try:
+        results = PurchaseService.create_purchases(db, [
+            {"supermarket_id": p.supermarket_id, "user_id": p.user_id, "items": p.items_list,
+             "idempotency_key": p.client_purchase_id}
+            for p in purchases
+        ])
+    except Exception as e:
+        logger.exception("Error while creating purchase batch")
+        raise HTTPException(status_code=500, detail=str(e))
+    created = sum(1 for r in results if r["status"] == "created")
+    logger.info("Purchase batch done: %s created, %s failed", created, len(results) - created)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+@router.get("/customers")
+def search_customers(
+    q: str = Query("", max_length=64, description="Customer id prefix"),
+    after: Optional[str] = Query(None, description="Cursor: next_after from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Search customers by id prefix, one keyset-paginated page at a time"""
+    return customers_page(db, q, after, limit)
+
+
+@router.post("/create")
+def create_purchase(p: PurchaseIn, response: Response,
+                    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+                    db: Session = Depends(get_db)):
+    request = checkout_request(p, idempotency_key)
+    checkout = WriteBehindQueue.submit if WriteBehindQueue.enabled else PurchaseService.checkout
+    with checkout_errors():
+        result = checkout(db=db, **request)
+    return checkout_response(result, response)
+
+
+@router.get("/write-behind/stats")
+def get_write_behind_stats():
+    """Expose write-behind queue depth and committed / dead-lettered / superseded counters"""
+    return WriteBehindQueue.stats()
+
+
+@router.post("/batch")
+def create_purchases(purchases: List[PurchaseIn], db: Session = Depends(get_db)):
+    """Record many purchases in one request; results are reported per purchase"""
+    return record_batch(db, purchases)
@@ -1,8 +1,27 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from shared.settings import settings
 
-DATABASE_URL = "postgresql://postgres:postgres@db:5432/supermarket"
+DATABASE_URL = settings.url
 
-engine = create_engine(DATABASE_URL, echo=False)
+# When enabled, routes are served by async controllers on an asyncpg-backed
+# AsyncSession instead of sync handlers on FastAPI's threadpool
+DB_ASYNC = settings.use_async
 
-SessionLocal = sessionmaker(bind=engine)
\ No newline at end of file
+engine = create_engine(DATABASE_URL, **settings.engine_kwargs())
+
+# expire_on_commit=False lets callers read what they just wrote without a
+# post-commit refresh query
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+# init_db, migrations and partition maintenance run without the request
+# statement_timeout (DB_STATEMENT_TIMEOUT_MS), which would cancel them
+maintenance_engine = create_engine(DATABASE_URL, **settings.engine_kwargs(maintenance=True))
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(settings.async_url, **settings.engine_kwargs(is_async=True))
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
@@ -1,8 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
 class PurchaseIn(BaseModel):
     supermarket_id: str
     user_id: Optional[str] = None
-    items_list: List[str]
\ No newline at end of file
+    items_list: List[str]
+    # Client-generated id (e.g. a uuid4) that makes retries idempotent;
+    # the Idempotency-Key header does the same for POST /purchase/create
+    client_purchase_id: Optional[str] = Field(None, min_length=1, max_length=255)
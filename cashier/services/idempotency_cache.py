@@ -0,0 +1,72 @@
+import os, time, threading, logging
+from collections import OrderedDict
+from shared.idempotency import IDEMPOTENCY_KEY_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Recently answered idempotency keys kept in memory per cashier process
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+
+class IdempotencyKeyReused(Exception):
+    """An idempotency key was sent again with a different purchase (422)"""
+
+
+def replay_result(key: str, entry, request_hash: str = None):
+    """The replayed result for a stored (result, request_hash) entry, or None.
+
+    Raises IdempotencyKeyReused when the key was stored for a different
+    request. Keys stored before request hashes were kept match anything.
+    """
+    if entry is None:
+        return None
+    result, stored_hash = entry
+    if stored_hash and request_hash and stored_hash != request_hash:
+        raise IdempotencyKeyReused(f"Idempotency key {key} was already used for a different purchase")
+    return {**result, "replayed": True}
+
+
+class IdempotencyCache:
+    """Process-wide LRU of idempotency key -> (stored purchase result, request hash).
+
+    A retry that lands on the same process right after the original request
+    (the usual case after a client timeout) is answered without touching the
+    database. Misses fall back to the idempotency_keys table, which remains
+    the source of truth across processes and restarts. An entry expires
+    with its key's retention period, when the purge deletes the row.
+    """
+
+    max_entries = IDEMPOTENCY_CACHE_SIZE
+    retention = IDEMPOTENCY_KEY_RETENTION_DAYS * 24 * 3600
+
+    # key -> (result, request hash, stored at as a Unix time)
+    _results = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key: str, now: float = None):
+        """(result, request_hash) for a key that has not expired, else None"""
+        with cls._lock:
+            entry = cls._results.get(key)
+            if entry is None:
+                return None
+            if (now or time.time()) - entry[2] >= cls.retention:
+                del cls._results[key]
+                return None
+            cls._results.move_to_end(key)
+        return entry[0], entry[1]
+
+    @classmethod
+    def put(cls, key: str, result: dict, request_hash: str = None, stored_at: float = None):
+        if cls.max_entries <= 0:
+            return
+        with cls._lock:
+            cls._results[key] = (result, request_hash, stored_at or time.time())
+            cls._results.move_to_end(key)
+            while len(cls._results) > cls.max_entries:
+                cls._results.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._results.clear()
@@ -0,0 +1,186 @@
+import os, json, time, threading, logging
+from sqlalchemy.orm import Session
+from shared.models.product import Product
+from shared.http_cache import PrecompressedBody
+
+logger = logging.getLogger(__name__)
+
+# Seconds a loaded catalog stays fresh; 0 disables the cache entirely
+PRODUCT_CATALOG_TTL = float(os.getenv("PRODUCT_CATALOG_TTL", "60"))
+# Shared secret for POST /product/catalog/invalidate (X-Admin-Token); unset disables the route
+PRODUCT_CATALOG_ADMIN_TOKEN = os.getenv("PRODUCT_CATALOG_ADMIN_TOKEN", "")
+# Seconds terminals may reuse /product/all before revalidating it by ETag
+PRODUCT_CATALOG_MAX_AGE = int(os.getenv("PRODUCT_CATALOG_MAX_AGE", "30"))
+CATALOG_CACHE_CONTROL = f"public, max-age={PRODUCT_CATALOG_MAX_AGE}"
+
+
+class ProductCatalog:
+    """Process-wide cache of product_name -> unit_price.
+
+    The whole products table is loaded once and reused until the TTL expires
+    or `invalidate()` is called. Names missing from the snapshot fall back to
+    the database so newly added products are still priced correctly.
+
+    A loaded dict is never modified, only replaced under `_lock`, so callers
+    may iterate the one they were handed without holding the lock.
+
+    `snapshot()` keeps the /product/all response serialized and compressed;
+    it is rebuilt only when the prices actually change (tracked by
+    `_generation`), not on every TTL refresh.
+    """
+
+    ttl = PRODUCT_CATALOG_TTL
+
+    _prices = None
+    _loaded_at = 0.0
+    _generation = 0
+    _snapshot = None
+    _snapshot_generation = None
+    _lock = threading.Lock()
+    # Only one request reloads an expired catalog; the others keep serving
+    # the stale snapshot meanwhile
+    _refresh_lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
+    @classmethod
+    def enabled(cls):
+        return cls.ttl > 0
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the current snapshot; the next lookup reloads it"""
+        logger.info("Invalidating product catalog cache")
+        with cls._lock:
+            cls._prices = None
+            cls._loaded_at = 0.0
+
+    @classmethod
+    def refresh(cls, db: Session):
+        """Reload the full catalog from the database"""
+        rows = db.query(Product.product_name, Product.unit_price).all()
+        prices = {name: float(price) for name, price in rows}
+        # The query above runs outside the lock so concurrent readers keep
+        # using the previous snapshot until the new one is swapped in
+        with cls._lock:
+            if prices != cls._prices:
+                cls._generation += 1
+            cls._prices = prices
+            cls._loaded_at = time.monotonic()
+            cls._stats["refreshes"] += 1
+        logger.info("Product catalog refreshed with %s products", len(prices))
+        return prices
+
+    @classmethod
+    def prices(cls, db: Session):
+        """Return the current name -> price snapshot, reloading it if stale"""
+        prices = cls._prices
+        if prices is None or time.monotonic() - cls._loaded_at >= cls.ttl:
+            # Never wait for another caller's refresh: under DB_ASYNC this runs
+            # on the event loop thread (AsyncSession.run_sync), where blocking
+            # on the lock would stall the very request that holds it
+            if cls._refresh_lock.acquire(blocking=False):
+                try:
+                    prices = cls._prices
+                    if prices is None or time.monotonic() - cls._loaded_at >= cls.ttl:
+                        prices = cls.refresh(db)
+                finally:
+                    cls._refresh_lock.release()
+            elif prices is None:
+                # Cold cache and nothing stale to serve: load it ourselves
+                prices = cls.refresh(db)
+            # Otherwise serve the stale snapshot while the refresh runs
+        return prices
+
+    @classmethod
+    def get_price(cls, db: Session, name: str):
+        """Return the unit price for a product, or None if it does not exist"""
+        return cls.get_prices(db, [name]).get(name)
+
+    @classmethod
+    def get_prices(cls, db: Session, names):
+        """Return {name: unit_price} for the given distinct names.
+
+        Unknown names are simply absent from the result. Cache misses are
+        resolved together with one `IN (...)` query.
+        """
+        names = list(names)
+        if not cls.enabled():
+            cls._record("misses", len(names))
+            return cls._fetch_prices(db, names)
+
+        snapshot = cls.prices(db)
+        found = {name: snapshot[name] for name in names if name in snapshot}
+        missing = [name for name in names if name not in found]
+        cls._record("hits", len(found))
+        if missing:
+            cls._record("misses", len(missing))
+            fetched = cls._fetch_prices(db, missing)
+            with cls._lock:
+                if cls._prices is not None and fetched:
+                    # Copy-on-write: readers iterate snapshots outside the lock
+                    cls._prices = {**cls._prices, **fetched}
+                    cls._generation += 1
+            found.update(fetched)
+        return found
+
+    @classmethod
+    def _fetch_prices(cls, db: Session, names):
+        if not names:
+            return {}
+        rows = db.query(Product.product_name, Product.unit_price) \
+            .filter(Product.product_name.in_(names)).all()
+        return {name: float(price) for name, price in rows}
+
+    @classmethod
+    def products(cls, db: Session):
+        """Return the catalog as a list of {"name", "price"} dicts"""
+        if cls.enabled():
+            prices = cls.prices(db)
+        else:
+            rows = db.query(Product.product_name, Product.unit_price).all()
+            prices = {name: float(price) for name, price in rows}
+        return [{"name": name, "price": price} for name, price in prices.items()]
+
+    @classmethod
+    def snapshot(cls, db: Session):
+        """The /product/all response body as a PrecompressedBody"""
+        if not cls.enabled():
+            return cls._build_snapshot(cls.products(db))
+        prices = cls.prices(db)
+        with cls._lock:
+            generation = cls._generation
+            snapshot = cls._snapshot
+            if snapshot is not None and cls._snapshot_generation == generation:
+                return snapshot
+            if cls._prices is not None:
+                prices = cls._prices
+            products = [{"name": name, "price": price} for name, price in prices.items()]
+        snapshot = cls._build_snapshot(products)
+        with cls._lock:
+            cls._snapshot = snapshot
+            cls._snapshot_generation = generation
+        logger.info("Product catalog snapshot rebuilt (%s bytes)", len(snapshot.variants["identity"]))
+        return snapshot
+
+    @staticmethod
+    def _build_snapshot(products):
+        return PrecompressedBody(json.dumps({"products": products}, separators=(",", ":")).encode())
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats["size"] = len(cls._prices) if cls._prices is not None else 0
+            stats["age_seconds"] = round(time.monotonic() - cls._loaded_at, 3) if cls._prices is not None else None
+        stats["ttl_seconds"] = cls.ttl
+        return stats
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            cls._stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
+    @classmethod
+    def _record(cls, counter: str, amount: int = 1):
+        with cls._lock:
+            cls._stats[counter] += amount
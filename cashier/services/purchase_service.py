@@ -1,89 +1,535 @@
-import uuid, logging
-from datetime import datetime
+import os, uuid, random, logging
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from cashier.models.user import User
-from cashier.models.product import Product
-from cashier.models.purchase import Purchase
+from shared.models.user import User
+from shared.models.purchase import Purchase
+from shared.models.purchase_item import PurchaseItem
+from shared.models.dashboard_summary import UserPurchaseCount, ProductSaleCount, PurchaseCounter
+from shared.models.idempotency_key import IdempotencyKey
+from cashier.services.product_catalog import ProductCatalog
+from cashier.services.idempotency_cache import IdempotencyCache, IdempotencyKeyReused, replay_result
+from shared.idempotency import request_hash
+from shared.log_utils import RowProgress
+from shared.sql import conflict_insert
+from shared.notifications import notify_dashboard
 
 logger = logging.getLogger(__name__)
 
+# Purchases written per transaction by create_purchases
+PURCHASE_BATCH_CHUNK_SIZE = int(os.getenv("PURCHASE_BATCH_CHUNK_SIZE", "1000"))
+
+def _prefix_upper_bound(prefix: str):
+    """Smallest string ordered after every string starting with prefix
+    (bytewise / code point order), or None if there is none"""
+    for i in range(len(prefix) - 1, -1, -1):
+        code = ord(prefix[i]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            # Surrogates cannot be encoded; they sort before U+E000 anyway
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:i] + chr(code)
+    return None
+
+
 class PurchaseService:
 
     @classmethod
     def get_all_customers(cls, db: Session):
         """Get all existing customers from database"""
         logger.info("Fetching all customers from database")
-        customers = db.query(User.user_id).all()
-        logger.debug(f"Found {len(customers)} customers")
-        return [customer[0] for customer in customers]
+        progress = RowProgress(logger, "get_all_customers")
+        customers = [customer[0] for customer in db.query(User.user_id).all()]
+        progress.add(len(customers))
+        progress.done(level=logging.DEBUG)
+        return customers
+
+    @classmethod
+    def search_customers(cls, db: Session, q: str = "", after: str = None, limit: int = 50):
+        """One page of customer ids in user_id order, optionally by prefix.
+
+        Keyset pagination: pass the returned cursor as `after` to get the
+        next page; it is None on the last page. The prefix is matched with an
+        escaped LIKE 'q%'. On PostgreSQL the match, the cursor comparison and
+        the ordering all use COLLATE "C", so ix_users_user_id_c answers a page
+        with one index range scan instead of sorting every match.
+        """
+        logger.info("Searching customers q=%r after=%r limit=%s", q, after, limit)
+        user_id = User.user_id
+        if db.get_bind().dialect.name == "postgresql":
+            user_id = user_id.collate("C")
+        query = db.query(User.user_id)
+        if q:
+            # The explicit range keeps the scan bounded even when the LIKE
+            # pattern is a parameter (prepared statements, generic plans)
+            query = query.filter(user_id.startswith(q, autoescape=True), user_id >= q)
+            upper = _prefix_upper_bound(q)
+            if upper is not None:
+                query = query.filter(user_id < upper)
+        if after:
+            query = query.filter(user_id > after)
+        # One extra row tells whether another page exists
+        rows = query.order_by(user_id).limit(limit + 1).all()
+        customers = [row[0] for row in rows[:limit]]
+        cursor = customers[-1] if len(rows) > limit else None
+        return customers, cursor
 
     @classmethod
     def get_or_create_user(cls, db: Session, user_id: str = None):
         """Get existing user or create new one with auto-generated ID"""
-        logger.info(f"get_or_create_user called with user_id={user_id}")
-
-        # If user_id is provided, try to find an existing user
-        if user_id:
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if user:
-                logger.info(f"Existing user found: {user.user_id}")
-                return user, False
-
-        logger.info("No user found, generating a new user ID")
-        # Create new user with auto-generated ID
-        generated_id = cls._generate_unique_user_id(db)
-        new_user = User(user_id=generated_id)
-        db.add(new_user)
+        user_id, is_new = cls._get_or_create_user(db, user_id)
         db.commit()
-        db.refresh(new_user)
-        logger.info(f"New user created: {new_user.user_id}")
-        return new_user, True
+        return db.get(User, user_id), is_new
 
     @classmethod
-    def _generate_unique_user_id(cls, db: Session):
-        """Generate a unique user_id for new customers"""
-        logger.info("Generating unique user_id")
+    def _get_or_create_user(cls, db: Session, user_id: str = None):
+        """Resolve the customer inside the caller's transaction (no commit).
+
+        Returns (user_id, is_new). Both paths are a single INSERT that skips
+        existing rows, so there is no SELECT probe before the write.
+        """
+        logger.info("get_or_create_user called with user_id=%s", user_id)
+
+        if user_id:
+            if cls._insert_user(db, user_id):
+                logger.info("User %s not found, registered it as a new customer", user_id)
+                return user_id, True
+            logger.info("Existing user found: %s", user_id)
+            return user_id, False
+
+        logger.info("No user_id supplied, generating a new user ID")
         while True:
             new_id = str(uuid.uuid4())
-            # Check if this ID already exists
-            existing = db.query(User).filter(User.user_id == new_id).first()
-            if not existing:
-                logger.debug(f"Generated unique user_id: {new_id}")
-                return new_id
+            # A uuid4 collision is practically impossible; if it ever
+            # happens the insert is skipped and we simply draw again
+            if cls._insert_user(db, new_id):
+                logger.info("New user created: %s", new_id)
+                return new_id, True
+
+    @classmethod
+    def _insert_user(cls, db: Session, user_id: str):
+        """Insert a user row, returning False if user_id already exists"""
+        dialect_insert = conflict_insert(db.get_bind())
+        if dialect_insert is not None:
+            stmt = dialect_insert(User).values(user_id=user_id) \
+                .on_conflict_do_nothing(index_elements=[User.user_id]) \
+                .returning(User.user_id)
+            return db.execute(stmt).first() is not None
+
+        # Portable fallback: attempt the insert inside a savepoint
+        try:
+            with db.begin_nested():
+                db.add(User(user_id=user_id))
+        except IntegrityError:
+            return False
+        return True
+
+    @classmethod
+    def price_items(cls, db: Session, items: list[str]):
+        """Price a basket with one lookup over its distinct product names.
+
+        Returns (total, lines) where lines maps each product name to a
+        (quantity, unit_price) tuple. All unknown products are reported
+        together in a single ValueError.
+        """
+        quantities = Counter(items)
+        prices = ProductCatalog.get_prices(db, quantities.keys())
+        return cls._price_lines(quantities, prices)
+
+    @staticmethod
+    def _price_lines(quantities: Counter, prices: dict):
+        unknown = [name for name in quantities if name not in prices]
+        if unknown:
+            label = "Unknown product" if len(unknown) == 1 else "Unknown products"
+            logger.error("%s: %s", label, ", ".join(unknown))
+            raise ValueError(f"{label}: {', '.join(unknown)}")
+
+        lines = {name: (qty, prices[name]) for name, qty in quantities.items()}
+        total = sum(qty * price for qty, price in lines.values())
+        return total, lines
 
     @classmethod
     def calculate_total(cls, db: Session, items: list[str]):
-        logger.debug(f"Calculating total for items: {items}")
-        total = 0
-        for item in items:
-            product = db.query(Product).filter(Product.product_name == item).first()
-            if not product:
-                logger.error(f"Unknown product: {item}")
-                raise ValueError(f"Unknown product: {item}")
-            total += product.unit_price
-        logger.debug(f"Total calculated: {total}")
+        logger.debug("Calculating total for items: %s", items)
+        total, _ = cls.price_items(db, items)
+        logger.debug("Total calculated: %s", total)
         return total
 
     @classmethod
-    def create_purchase(cls, db: Session, supermarket_id: str, user_id: str = None, items: list[str] = None):
-        logger.info(f"Creating purchase for supermarket_id={supermarket_id}, user_id={user_id}")
-        user, is_new = cls.get_or_create_user(db, user_id)
-        total = cls.calculate_total(db, items)
-        logger.info(f"Purchase total: {total}")
+    def checkout(cls, db: Session, supermarket_id: str, user_id: str = None, items: list[str] = None,
+                 idempotency_key: str = None):
+        """Record a sale and return its result as sent to the terminal.
 
-        purchase = Purchase(
-            id=str(uuid.uuid4()),
-            supermarket_id=supermarket_id,
-            user_id=user.user_id,
-            items_list=",".join(items),
-            total_amount=total,
-            timestamp=datetime.utcnow()
-        )
+        With an idempotency_key, a key that was already used is answered with
+        the stored result (replayed=True) without pricing or writing anything,
+        so a terminal can safely retry a request that timed out. A key used
+        for a different purchase raises IdempotencyKeyReused.
+        """
+        fingerprint = request_hash(supermarket_id, user_id, items)
+        if idempotency_key:
+            stored = cls.stored_result(db, idempotency_key, fingerprint)
+            if stored is not None:
+                logger.info("Replaying purchase %s for idempotency key %s", stored["purchase_id"], idempotency_key)
+                return stored
+        try:
+            purchase, is_new = cls.create_purchase(db, supermarket_id, user_id, items, idempotency_key)
+        except IntegrityError:
+            # A concurrent retry with the same key committed first
+            stored = cls.stored_result(db, idempotency_key, fingerprint) if idempotency_key else None
+            if stored is None:
+                raise
+            logger.info("Idempotency key %s was stored concurrently, replaying it", idempotency_key)
+            return stored
 
-        logger.debug(f"Saving purchase {purchase} for user {user.user_id}")
-        db.add(purchase)
-        db.commit()
-        db.refresh(purchase)
-        logger.info(f"Purchase created successfully: {purchase.id}")
+        result = {
+            "purchase_id": purchase.id,
+            "user_id": purchase.user_id,
+            "is_new": is_new,
+            "total_amount": purchase.total_amount,
+        }
+        if idempotency_key:
+            IdempotencyCache.put(idempotency_key, result, fingerprint)
+        return {**result, "replayed": False}
+
+    @classmethod
+    def create_purchase(cls, db: Session, supermarket_id: str, user_id: str = None, items: list[str] = None,
+                        idempotency_key: str = None):
+        """Record a sale in a single transaction.
+
+        Pricing runs before any write so an unknown product leaves no orphan
+        user behind; the user upsert, the purchase, its purchase_items rows
+        and the dashboard summary counters share one commit.
+        An idempotency_key is stored in the same transaction; if it is
+        already taken the insert raises IntegrityError and nothing is written.
+        Returns (purchase, is_new). The purchase carries every value the
+        caller needs, so it is not refreshed after the commit.
+        """
+        items = items or []
+        logger.info("Creating purchase for supermarket_id=%s, user_id=%s", supermarket_id, user_id)
+        total, lines = cls.price_items(db, items)
+        logger.info("Purchase total: %s", total)
+
+        original_user_id = user_id
+        try:
+            user_id, is_new = cls._get_or_create_user(db, user_id)
+            purchase = Purchase(
+                id=str(uuid.uuid4()),
+                supermarket_id=supermarket_id,
+                user_id=user_id,
+                items_list=",".join(items),
+                total_amount=total,
+            )
+            if idempotency_key:
+                cls._insert_idempotency_keys(db, [{
+                    "key": idempotency_key,
+                    "purchase_id": purchase.id,
+                    "user_id": user_id,
+                    "is_new": is_new,
+                    "total_amount": total,
+                    "request_hash": request_hash(supermarket_id, original_user_id, items),
+                }])
+
+            logger.debug("Saving purchase %s for user %s", purchase, user_id)
+            db.add(purchase)
+            # items_list stays populated for readers that have not moved to
+            # purchase_items yet
+            db.add_all([
+                PurchaseItem(
+                    purchase_id=purchase.id,
+                    product_name=name,
+                    quantity=qty,
+                    unit_price_at_sale=price,
+                )
+                for name, (qty, price) in lines.items()
+            ])
+            # Write the purchase first so the summary rows, which every
+            # checkout touches, stay locked for as short a time as possible
+            db.flush()
+            cls._record_dashboard_summary(
+                db,
+                {user_id: 1},
+                {name: qty for name, (qty, _) in lines.items()},
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        logger.info("Purchase created successfully: %s", purchase.id)
+
+        return purchase, is_new
+
+    @classmethod
+    def create_purchases(cls, db: Session, purchases: list[dict], chunk_size: int = PURCHASE_BATCH_CHUNK_SIZE):
+        """Record many sales at once (e.g. a store replaying queued sales).
+
+        Each purchase is a dict with supermarket_id, user_id, items and an
+        optional idempotency_key. Every basket is priced from one catalog
+        lookup; users, purchases and purchase_items are then written with
+        multi-row inserts, committing once per chunk_size purchases. Returns
+        one result per purchase, in input order. A failed chunk is rolled back
+        and reported per purchase, while earlier chunks stay committed.
+        Purchases whose key was already used, in an earlier request or earlier
+        in this batch, are answered with the stored result (replayed=True),
+        or with an error if the key was used for a different purchase.
+        """
+        logger.info("Creating %s purchases in chunks of %s", len(purchases), chunk_size)
+        stored = cls.stored_entries(db, {p["idempotency_key"] for p in purchases if p.get("idempotency_key")})
+
+        results = [None] * len(purchases)
+        pending, first_use, repeats = [], {}, []
+        for index, purchase in enumerate(purchases):
+            key = purchase.get("idempotency_key")
+            fingerprint = request_hash(purchase["supermarket_id"], purchase.get("user_id"), purchase.get("items"))
+            try:
+                if key in stored:
+                    results[index] = {"index": index, "status": "created",
+                                      **replay_result(key, stored[key], fingerprint)}
+                elif key in first_use:
+                    first, first_hash = first_use[key]
+                    replay_result(key, ({}, first_hash), fingerprint)
+                    repeats.append((index, first))
+                else:
+                    if key:
+                        first_use[key] = (index, fingerprint)
+                    pending.append((index, {**purchase, "request_hash": fingerprint}))
+            except IdempotencyKeyReused as e:
+                results[index] = {"index": index, "status": "error", "error": str(e)}
+        if len(pending) < len(purchases):
+            logger.info("%s purchases in the batch are replays", len(purchases) - len(pending))
+
+        baskets = [Counter(p.get("items") or []) for _, p in pending]
+        prices = ProductCatalog.get_prices(db, set().union(*baskets))
+        priced = []
+        for (index, purchase), quantities in zip(pending, baskets):
+            try:
+                total, lines = cls._price_lines(quantities, prices)
+            except ValueError as e:
+                results[index] = {"index": index, "status": "error", "error": str(e)}
+                continue
+            priced.append((index, purchase, total, lines))
+
+        progress = RowProgress(logger, "create_purchases")
+        for start in range(0, len(priced), chunk_size):
+            chunk = priced[start:start + chunk_size]
+            try:
+                created = cls.write_purchases(db, chunk)
+                db.commit()
+                cls.remember_keys(chunk, dict(created))
+            except Exception as e:
+                db.rollback()
+                logger.exception("Batch chunk of %s purchases failed", len(chunk))
+                created = [(index, {"index": index, "status": "error", "error": f"Could not store purchase: {e}"})
+                           for index, *_ in chunk]
+            for index, result in created:
+                results[index] = result
+            progress.add(len(chunk))
+        progress.done()
+
+        for index, first in repeats:
+            result = {**results[first], "index": index}
+            if result["status"] == "created":
+                result["replayed"] = True
+            results[index] = result
+        return results
+
+    @classmethod
+    def write_purchases(cls, db: Session, chunk):
+        """Insert one chunk of priced purchases inside the caller's transaction.
+
+        A purchase may carry its own purchase_id and timestamp (the
+        write-behind queue assigns both when the sale is accepted); otherwise
+        a uuid4 is drawn and the timestamp is the time of the write.
+        """
+        given = {purchase.get("user_id") for _, purchase, _, _ in chunk if purchase.get("user_id")}
+        new_users = cls._insert_users(db, given)
+        generated = cls._create_generated_users(db, sum(1 for _, p, _, _ in chunk if not p.get("user_id")))
+
+        purchase_rows, item_rows, key_rows, results = [], [], [], []
+        user_counts, product_counts = Counter(), Counter()
+        for index, purchase, total, lines in chunk:
+            user_id = purchase.get("user_id")
+            if user_id:
+                # Only the first purchase of a newly registered customer is "new"
+                is_new = user_id in new_users
+                new_users.discard(user_id)
+            else:
+                user_id, is_new = generated.pop(), True
+            purchase_id = purchase.get("purchase_id") or str(uuid.uuid4())
+            row = {
+                "id": purchase_id,
+                "supermarket_id": purchase["supermarket_id"],
+                "user_id": user_id,
+                "items_list": ",".join(purchase.get("items") or []),
+                "total_amount": total,
+            }
+            if purchase.get("timestamp"):
+                row["timestamp"] = purchase["timestamp"]
+            purchase_rows.append(row)
+            if purchase.get("idempotency_key"):
+                key_rows.append({
+                    "key": purchase["idempotency_key"],
+                    "purchase_id": purchase_id,
+                    "user_id": user_id,
+                    "is_new": is_new,
+                    "total_amount": total,
+                    "request_hash": purchase.get("request_hash"),
+                })
+            for name, (qty, price) in lines.items():
+                item_rows.append({
+                    "purchase_id": purchase_id,
+                    "product_name": name,
+                    "quantity": qty,
+                    "unit_price_at_sale": price,
+                })
+                product_counts[name] += qty
+            user_counts[user_id] += 1
+            results.append((index, {
+                "index": index,
+                "status": "created",
+                "purchase_id": purchase_id,
+                "user_id": user_id,
+                "is_new": is_new,
+                "total_amount": total,
+                "replayed": False,
+            }))
+
+        if any("timestamp" in row for row in purchase_rows):
+            # executemany needs the same columns in every row
+            now = datetime.now(timezone.utc)
+            for row in purchase_rows:
+                row.setdefault("timestamp", now)
+
+        # Keys go first: a key taken by a concurrent request fails the chunk
+        # before anything else is written
+        cls._insert_idempotency_keys(db, key_rows)
+        # Core table inserts skip the ORM's per-row bookkeeping
+        db.execute(insert(Purchase.__table__), purchase_rows)
+        if item_rows:
+            db.execute(insert(PurchaseItem.__table__), item_rows)
+        cls._record_dashboard_summary(db, user_counts, product_counts)
+        return results
+
+    @classmethod
+    def _insert_idempotency_keys(cls, db: Session, rows: list[dict]):
+        if rows:
+            db.execute(insert(IdempotencyKey.__table__), rows)
+
+    @classmethod
+    def stored_result(cls, db: Session, key: str, fingerprint: str = None):
+        """The stored result (replayed=True) if key was already used, else None.
+
+        Raises IdempotencyKeyReused if it was used for a request whose
+        request_hash differs from fingerprint.
+        """
+        return replay_result(key, cls.stored_entries(db, [key]).get(key), fingerprint)
+
+    @classmethod
+    def stored_entries(cls, db: Session, keys):
+        """{key: (stored result, request hash)} for the keys already used.
+
+        Recently used keys come from the in-memory IdempotencyCache; the rest
+        are looked up together in the idempotency_keys table.
+        """
+        found, missing = {}, []
+        for key in keys:
+            entry = IdempotencyCache.get(key)
+            if entry is not None:
+                found[key] = entry
+            else:
+                missing.append(key)
+        if missing:
+            table = IdempotencyKey.__table__
+            rows = db.execute(select(
+                table.c.key, table.c.purchase_id, table.c.user_id, table.c.is_new, table.c.total_amount,
+                table.c.request_hash, table.c.created_at,
+            ).where(table.c.key.in_(missing)))
+            for key, purchase_id, user_id, is_new, total, fingerprint, created_at in rows:
+                result = {"purchase_id": purchase_id, "user_id": user_id, "is_new": is_new, "total_amount": total}
+                if created_at is not None and created_at.tzinfo is None:
+                    # SQLite returns the UTC timestamp without its offset
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                IdempotencyCache.put(key, result, fingerprint, created_at.timestamp() if created_at else None)
+                found[key] = (result, fingerprint)
+        return found
+
+    @classmethod
+    def remember_keys(cls, chunk, created: dict):
+        """Cache the results of a committed chunk under their idempotency keys"""
+        for index, purchase, _, _ in chunk:
+            key = purchase.get("idempotency_key")
+            if key:
+                result = created[index]
+                IdempotencyCache.put(key, {name: result[name] for name in
+                                           ("purchase_id", "user_id", "is_new", "total_amount")},
+                                     purchase.get("request_hash"))
+
+    @classmethod
+    def _insert_users(cls, db: Session, user_ids):
+        """Insert the users that do not exist yet; returns the set inserted"""
+        if not user_ids:
+            return set()
+        ordered = sorted(user_ids)
+        dialect_insert = conflict_insert(db.get_bind())
+        if dialect_insert is not None:
+            # executemany form: the statement compiles once and is cached,
+            # and SQLAlchemy batches the rows into multi-row VALUES
+            stmt = dialect_insert(User) \
+                .on_conflict_do_nothing(index_elements=[User.user_id]) \
+                .returning(User.user_id)
+            return set(db.execute(stmt, [{"user_id": u} for u in ordered]).scalars())
+
+        existing = set(db.scalars(select(User.user_id).where(User.user_id.in_(ordered))))
+        missing = [u for u in ordered if u not in existing]
+        if missing:
+            db.execute(insert(User), [{"user_id": u} for u in missing])
+        return set(missing)
+
+    @classmethod
+    def _create_generated_users(cls, db: Session, count: int):
+        """Register count customers with fresh uuid4 ids; returns their ids"""
+        created = set()
+        while len(created) < count:
+            # Redraw the (practically impossible) collisions
+            created |= cls._insert_users(db, {str(uuid.uuid4()) for _ in range(count - len(created))})
+        return created
+
+    @classmethod
+    def _record_dashboard_summary(cls, db: Session, user_counts: dict, product_counts: dict):
+        """Add purchase counts per user and units sold per product to the
+        owner dashboard summary tables, inside the caller's transaction"""
+        # Sorted keys give every transaction the same lock order (no deadlocks)
+        user_rows = [{"user_id": k, "purchase_count": v} for k, v in sorted(user_counts.items())]
+        product_rows = [{"product_name": k, "sale_count": v} for k, v in sorted(product_counts.items())]
+        purchases = sum(user_counts.values())
+        cls._increment(db, UserPurchaseCount, "user_id", "purchase_count", user_rows)
+        cls._increment(db, ProductSaleCount, "product_name", "sale_count", product_rows)
+        # Part of the owner's cache version: changes on every purchase, even
+        # one with an empty basket or an older timestamp
+        cls._increment(db, PurchaseCounter, "slot", "purchase_count",
+                       [{"slot": random.randrange(PurchaseCounter.SLOTS), "purchase_count": purchases}])
+        # Wakes the owner's live dashboard stream once this transaction commits
+        notify_dashboard(db, str(purchases))
+
+    @classmethod
+    def _increment(cls, db: Session, model, key: str, counter: str, rows: list[dict]):
+        if not rows:
+            return
+        dialect_insert = conflict_insert(db.get_bind())
+        if dialect_insert is not None:
+            stmt = dialect_insert(model)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[getattr(model, key)],
+                set_={counter: getattr(model, counter) + getattr(stmt.excluded, counter)},
+            )
+            db.execute(stmt, rows)
+            return
 
-        return purchase, is_new, user.user_id
+        # Portable fallback: update, then insert the keys that did not exist yet
+        column = getattr(model, counter)
+        for row in rows:
+            updated = db.query(model).filter(getattr(model, key) == row[key]) \
+                .update({counter: column + row[counter]}, synchronize_session=False)
+            if not updated:
+                db.add(model(**row))
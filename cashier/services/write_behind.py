@@ -0,0 +1,524 @@
+import os, json, time, uuid, fcntl, queue, asyncio, threading, logging
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from shared.settings import env_bool
+from shared.models.purchase import Purchase
+from shared.models.idempotency_key import IdempotencyKey
+from shared.idempotency import request_hash
+from cashier.services.purchase_service import PurchaseService
+from cashier.services.idempotency_cache import replay_result
+
+logger = logging.getLogger(__name__)
+
+# Accept purchases into a durable local queue and write them in group commits
+PURCHASE_WRITE_BEHIND = env_bool(os.environ, "PURCHASE_WRITE_BEHIND", False)
+# A group commit is written once it holds this many purchases...
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+# ...or this many milliseconds after its first purchase arrived
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "20"))
+# Accepted but uncommitted purchases allowed before new ones get 503
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+# Directory of the write-ahead log; one directory per cashier process
+PURCHASE_WAL_DIR = os.getenv("PURCHASE_WAL_DIR", "wal")
+# Size at which the log moves on to a new segment file
+PURCHASE_WAL_SEGMENT_BYTES = int(os.getenv("PURCHASE_WAL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+# Failed attempts before a group commit is split up and a purchase that
+# still cannot be written is moved to the dead-letter file
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+
+
+class QueueFull(Exception):
+    """The write-behind queue is at capacity; the caller should retry later"""
+
+
+class WalDirectoryInUse(RuntimeError):
+    """Another process already owns the write-ahead log directory"""
+
+
+class WriteAheadLog:
+    """Append-only log of accepted purchases, split into numbered segments.
+
+    `append()` returns once the record is fsynced. Concurrent appends share
+    their fsyncs: whoever takes the sync lock flushes everything written so
+    far, and callers whose record that covered return without syncing
+    again. A segment file is deleted once every record in it has been
+    committed to the database (`release()`) and a newer segment is in use.
+
+    The directory is locked (flock) for the lifetime of the log: a second
+    process would otherwise recover, and delete, segments still being
+    written by the first.
+
+    Records that can never be committed are moved to the dead-letter file
+    (`dead_letter()`), one JSON line each with the reason, for an operator
+    to inspect; it is never replayed.
+    """
+
+    SUFFIX = ".wal"
+    LOCK_FILE = "LOCK"
+    DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+    def __init__(self, directory: str, segment_bytes: int = PURCHASE_WAL_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(directory, self.LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            raise WalDirectoryInUse(
+                f"{directory} is used by another process; give each cashier process its own PURCHASE_WAL_DIR")
+        # File writes and segment bookkeeping; the sync lock is always taken first
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # segment -> records appended to it and not released yet
+        self._pending = {}
+        # Descriptors of rotated segments still waiting for their last fsync
+        self._retired = []
+        self._written = 0
+        self._synced = 0
+        self._segment = max(self.segments(), default=0) + 1
+        self._open_segment()
+
+    def segments(self):
+        """Numbers of the segment files on disk, oldest first"""
+        names = (name[:-len(self.SUFFIX)] for name in os.listdir(self.directory) if name.endswith(self.SUFFIX))
+        return sorted(int(name) for name in names if name.isdigit())
+
+    def path(self, segment: int):
+        return os.path.join(self.directory, f"{segment:08d}{self.SUFFIX}")
+
+    def recover(self):
+        """Records left by a previous process, as (segment, record) pairs.
+
+        They stay pending until released, like freshly appended ones. A torn
+        last line (a crash mid-append) was never acknowledged and is skipped.
+        """
+        recovered = []
+        with self._lock:
+            for segment in self.segments():
+                if segment >= self._segment:
+                    continue
+                records = []
+                with open(self.path(segment), "rb") as f:
+                    for line in f:
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            logger.warning("Skipping a torn record in %s", self.path(segment))
+                if records:
+                    self._pending[segment] = len(records)
+                    recovered.extend((segment, record) for record in records)
+                else:
+                    os.remove(self.path(segment))
+        if recovered:
+            logger.info("Recovered %s uncommitted purchases from %s", len(recovered), self.directory)
+        return recovered
+
+    def append(self, record: dict):
+        """Durably append a record; returns the segment it was written to"""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self._lock:
+            if self._size >= self.segment_bytes:
+                self._rotate()
+            segment = self._segment
+            os.write(self._fd, line)
+            self._size += len(line)
+            self._pending[segment] = self._pending.get(segment, 0) + 1
+            self._written += 1
+            sequence = self._written
+        self._sync(sequence)
+        return segment
+
+    def release(self, counts: dict):
+        """Mark {segment: n} records as committed, deleting finished segments"""
+        with self._lock:
+            for segment, count in counts.items():
+                left = self._pending.get(segment, 0) - count
+                self._pending[segment] = left
+                if left <= 0 and segment != self._segment:
+                    self._delete(segment)
+
+    def dead_letter(self, record: dict, reason: str):
+        """Durably keep a record that will not be written, with the reason"""
+        line = json.dumps({"record": record, "reason": reason, "at": datetime.now(timezone.utc).isoformat()},
+                          separators=(",", ":")) + "\n"
+        with self._lock:
+            fd = os.open(os.path.join(self.directory, self.DEAD_LETTER_FILE), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line.encode())
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        with self._sync_lock, self._lock:
+            for fd in self._retired + [self._fd]:
+                os.fsync(fd)
+                os.close(fd)
+            self._retired = []
+            # Closing the descriptor releases the directory lock
+            os.close(self._lock_fd)
+
+    def _sync(self, sequence: int):
+        with self._sync_lock:
+            if self._synced >= sequence:
+                return
+            with self._lock:
+                target = self._written
+                fds, self._retired = self._retired + [self._fd], []
+            for fd in fds:
+                os.fsync(fd)
+            for fd in fds[:-1]:
+                os.close(fd)
+            self._synced = target
+
+    def _open_segment(self):
+        self._fd = os.open(self.path(self._segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        # Make the new file's directory entry durable as well
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _rotate(self):
+        previous = self._segment
+        self._retired.append(self._fd)
+        self._segment += 1
+        self._open_segment()
+        if self._pending.get(previous, 0) <= 0:
+            self._delete(previous)
+
+    def _delete(self, segment: int):
+        self._pending.pop(segment, None)
+        try:
+            os.remove(self.path(segment))
+        except FileNotFoundError:
+            pass
+
+
+class WriteBehindQueue:
+    """Optional write-behind path for POST /purchase/create.
+
+    A purchase is priced and validated in the request, appended to the local
+    write-ahead log and queued; the response is sent as soon as the log
+    append is fsynced. A worker thread drains the queue in group commits of
+    up to batch_size purchases or flush_interval seconds, through the same
+    multi-row writes as POST /purchase/batch. When capacity purchases are
+    waiting, new ones are refused with QueueFull (503) until it drains.
+
+    Records left in the log by a crash are replayed on the next start;
+    purchases that already reached the database are skipped, so a replay
+    never duplicates a sale.
+
+    While the database is unreachable a group commit is retried until it
+    succeeds. Any other error is retried max_retries times; then the batch
+    is written one purchase at a time, and a purchase that still fails is
+    moved to the log's dead-letter file so later sales are not held up.
+    Purchases dropped because their idempotency key was committed by
+    another process are recorded there too, as their purchase_id was
+    already handed out. `stats()` counts both.
+    """
+
+    enabled = PURCHASE_WRITE_BEHIND
+    batch_size = WRITE_BEHIND_BATCH_SIZE
+    flush_interval = WRITE_BEHIND_FLUSH_MS / 1000
+    capacity = WRITE_BEHIND_QUEUE_SIZE
+    max_retries = WRITE_BEHIND_MAX_RETRIES
+
+    _session_factory = None
+    _wal = None
+    _queue = queue.Queue()
+    _depth = 0
+    # idempotency key -> (result, request hash) of accepted purchases not committed yet
+    _pending_keys = {}
+    _lock = threading.Lock()
+    _stop = threading.Event()
+    _thread = None
+    _stats = {"committed": 0, "dead_lettered": 0, "superseded": 0}
+
+    @classmethod
+    def start(cls, session_factory, directory: str = PURCHASE_WAL_DIR):
+        """Open the log, queue whatever a previous process left in it and start the worker"""
+        cls._session_factory = session_factory
+        cls._wal = WriteAheadLog(directory)
+        cls._queue = queue.Queue()
+        cls._pending_keys = {}
+        cls._stats = {"committed": 0, "dead_lettered": 0, "superseded": 0}
+        cls._stop.clear()
+        recovered = cls._wal.recover()
+        cls._depth = len(recovered)
+        for segment, record in recovered:
+            if record.get("idempotency_key"):
+                cls._pending_keys[record["idempotency_key"]] = (cls._result(record), record.get("request_hash"))
+            cls._queue.put((segment, record, True))
+        cls._thread = threading.Thread(target=cls._run, name="purchase-write-behind", daemon=True)
+        cls._thread.start()
+        logger.info("Write-behind queue started (batch %s, %.0f ms, capacity %s, log %s)",
+                    cls.batch_size, cls.flush_interval * 1000, cls.capacity, directory)
+
+    @classmethod
+    def stop(cls, timeout: float = 30):
+        """Flush what is queued, then stop the worker and close the log"""
+        cls._stop.set()
+        if cls._thread is not None:
+            cls._thread.join(timeout)
+            if cls._thread.is_alive():
+                logger.warning("Write-behind worker did not drain in %ss; the log keeps the rest", timeout)
+        if cls._wal is not None:
+            cls._wal.close()
+        cls._thread = cls._wal = None
+
+    @classmethod
+    def submit(cls, db: Session, supermarket_id: str, user_id: str = None, items: list[str] = None,
+               idempotency_key: str = None):
+        """Accept a sale; returns its result once it is durable in the log"""
+        replay, record = cls.prepare(db, supermarket_id, user_id, items, idempotency_key)
+        if replay is not None:
+            return replay
+        return cls.enqueue(record)
+
+    @classmethod
+    async def submit_async(cls, db: AsyncSession, supermarket_id: str, user_id: str = None,
+                           items: list[str] = None, idempotency_key: str = None):
+        """submit for an AsyncSession; the log fsync runs off the event loop"""
+        replay, record = await db.run_sync(cls.prepare, supermarket_id, user_id, items, idempotency_key)
+        if replay is not None:
+            return replay
+        return await asyncio.to_thread(cls.enqueue, record)
+
+    @classmethod
+    def prepare(cls, db: Session, supermarket_id: str, user_id: str = None, items: list[str] = None,
+                idempotency_key: str = None):
+        """Price and validate a sale without writing to the database.
+
+        Returns (replay, None) when the idempotency key was already used,
+        else (None, record) with the log record to enqueue. Unknown products
+        raise ValueError as in create_purchase, and a key already used for
+        a different purchase raises IdempotencyKeyReused.
+        """
+        fingerprint = request_hash(supermarket_id, user_id, items)
+        if idempotency_key:
+            stored = (cls._pending_result(idempotency_key, fingerprint)
+                      or PurchaseService.stored_result(db, idempotency_key, fingerprint))
+            if stored is not None:
+                return stored, None
+        items = items or []
+        total, lines = PurchaseService.price_items(db, items)
+        record = {
+            "purchase_id": str(uuid.uuid4()),
+            "supermarket_id": supermarket_id,
+            # A generated customer id is handed out now; the row is created with the purchase
+            "user_id": user_id or str(uuid.uuid4()),
+            "new_user": not user_id,
+            "items": items,
+            "lines": {name: [qty, price] for name, (qty, price) in lines.items()},
+            "total_amount": total,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "idempotency_key": idempotency_key,
+            "request_hash": fingerprint,
+        }
+        return None, record
+
+    @classmethod
+    def enqueue(cls, record: dict):
+        """Reserve queue space, append the record to the log and queue it.
+
+        Blocks for the log fsync, so async callers run it in a thread.
+        """
+        key = record.get("idempotency_key")
+        result = cls._result(record)
+        with cls._lock:
+            if key and key in cls._pending_keys:
+                return replay_result(key, cls._pending_keys[key], record.get("request_hash"))
+            if cls._depth >= cls.capacity:
+                raise QueueFull(f"{cls._depth} purchases are waiting to be written")
+            cls._depth += 1
+            if key:
+                cls._pending_keys[key] = (result, record.get("request_hash"))
+        try:
+            segment = cls._wal.append(record)
+        except Exception:
+            with cls._lock:
+                cls._depth -= 1
+                cls._pending_keys.pop(key, None)
+            raise
+        cls._queue.put((segment, record, False))
+        return {**result, "replayed": False, "queued": True}
+
+    @classmethod
+    def depth(cls):
+        return cls._depth
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {**cls._stats, "depth": cls._depth}
+
+    @classmethod
+    def _record(cls, counter: str, amount: int = 1):
+        with cls._lock:
+            cls._stats[counter] += amount
+
+    @staticmethod
+    def _result(record: dict):
+        # Whether a supplied customer id is new is only known once it is written
+        return {
+            "purchase_id": record["purchase_id"],
+            "user_id": record["user_id"],
+            "is_new": True if record.get("new_user") else None,
+            "total_amount": record["total_amount"],
+        }
+
+    @classmethod
+    def _pending_result(cls, key: str, fingerprint: str = None):
+        with cls._lock:
+            entry = cls._pending_keys.get(key)
+        return replay_result(key, entry, fingerprint)
+
+    @classmethod
+    def _run(cls):
+        while not (cls._stop.is_set() and cls._queue.empty()):
+            try:
+                batch = [cls._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            try:
+                deadline = time.monotonic() + cls.flush_interval
+                while len(batch) < cls.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        batch.append(cls._queue.get(timeout=remaining) if remaining > 0 else cls._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not cls._flush(batch):
+                    return
+            except Exception:
+                # Keep the worker alive: a dead worker would leave every later
+                # checkout waiting for a 503. The batch goes back on the queue,
+                # checked against the database in case part of it was written.
+                logger.exception("Write-behind worker failed on a batch of %s purchases, requeueing", len(batch))
+                for segment, record, _ in batch:
+                    cls._queue.put((segment, record, True))
+                cls._stop.wait(0.1)
+
+    @classmethod
+    def _flush(cls, batch):
+        """Write one group commit; returns False if the queue stopped first"""
+        # Recovered records, and any retry (the failed commit may have landed),
+        # are checked against the database first
+        check = any(recovered for _, _, recovered in batch)
+        delay = 0.1
+        failures = 0
+        while True:
+            try:
+                with cls._session_factory() as db:
+                    written = cls._write(db, [record for _, record, _ in batch], check)
+                break
+            except Exception as e:
+                if not cls._unreachable(e):
+                    failures += 1
+                    if failures >= cls.max_retries:
+                        return cls._give_up(batch, e)
+                logger.exception("Write-behind commit of %s purchases failed, retrying in %.1fs", len(batch), delay)
+                if cls._stop.wait(delay):
+                    logger.warning("Stopping with %s purchases unwritten; they stay in the log", len(batch))
+                    return False
+                check, delay = True, min(delay * 2, 5)
+
+        cls._finish(batch)
+        cls._record("committed", written)
+        logger.info("Write-behind committed %s purchases (%s skipped as already stored)",
+                    written, len(batch) - written)
+        return True
+
+    @staticmethod
+    def _unreachable(error: Exception):
+        """Whether a failed commit says nothing about the records themselves"""
+        return isinstance(error, (OperationalError, InterfaceError)) or getattr(error, "connection_invalidated", False)
+
+    @classmethod
+    def _give_up(cls, batch, error: Exception):
+        """Isolate the purchases a group commit keeps failing on"""
+        if len(batch) > 1:
+            logger.error("Write-behind commit of %s purchases keeps failing; writing them one at a time", len(batch))
+            return all(cls._flush([(segment, record, True)]) for segment, record, _ in batch)
+        _, record, _ = batch[0]
+        logger.error("Moving purchase %s to the dead-letter file after %s failed commits: %s",
+                     record["purchase_id"], cls.max_retries, error)
+        cls._wal.dead_letter(record, f"{type(error).__name__}: {error}")
+        cls._record("dead_lettered")
+        cls._finish(batch)
+        return True
+
+    @classmethod
+    def _finish(cls, batch):
+        """Free a batch that was written (or dead-lettered) and release it from the log"""
+        cls._forget(batch)
+        try:
+            cls._wal.release(Counter(segment for segment, _, _ in batch))
+        except Exception:
+            # The sales are committed; at worst their segment is replayed and skipped
+            logger.exception("Could not release %s purchases from the write-ahead log", len(batch))
+
+    @classmethod
+    def _forget(cls, batch):
+        """Free the queue space and pending keys held by a finished batch"""
+        with cls._lock:
+            cls._depth -= len(batch)
+            for _, record, _ in batch:
+                cls._pending_keys.pop(record.get("idempotency_key"), None)
+
+    @classmethod
+    def _write(cls, db: Session, records: list[dict], check: bool):
+        superseded = []
+        if check:
+            stored, superseded = cls._stored(db, records)
+            records = [r for r in records if r["purchase_id"] not in stored]
+        chunk = [
+            (index, {**record, "timestamp": datetime.fromisoformat(record["timestamp"])}, record["total_amount"],
+             {name: tuple(line) for name, line in record["lines"].items()})
+            for index, record in enumerate(records)
+        ]
+        if chunk:
+            created = PurchaseService.write_purchases(db, chunk)
+            db.commit()
+            PurchaseService.remember_keys(chunk, dict(created))
+        for record, purchase_id in superseded:
+            cls._supersede(record, purchase_id)
+        return len(chunk)
+
+    @classmethod
+    def _supersede(cls, record: dict, purchase_id: str):
+        # The client already holds record's purchase_id; keep what it maps to
+        logger.warning("Idempotency key %s was committed elsewhere as %s; dropping %s",
+                       record["idempotency_key"], purchase_id, record["purchase_id"])
+        cls._wal.dead_letter(record, f"superseded by {purchase_id}")
+        cls._record("superseded")
+
+    @classmethod
+    def _stored(cls, db: Session, records: list[dict]):
+        """Purchase ids of records that must not be written again, and the superseded ones.
+
+        That is a purchase already in the database, or an idempotency key that
+        another cashier process committed first; the latter are also returned
+        as (record, purchase id it was committed as) pairs.
+        """
+        ids = [r["purchase_id"] for r in records]
+        stored = set(db.scalars(select(Purchase.id).where(Purchase.id.in_(ids))))
+        keys = {r["idempotency_key"]: r for r in records if r.get("idempotency_key")}
+        superseded = []
+        if keys:
+            for key, purchase_id in db.execute(select(IdempotencyKey.key, IdempotencyKey.purchase_id)
+                                               .where(IdempotencyKey.key.in_(keys))):
+                record = keys[key]
+                if purchase_id != record["purchase_id"]:
+                    superseded.append((record, purchase_id))
+                stored.add(record["purchase_id"])
+        return stored, superseded
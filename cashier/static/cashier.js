@@ -0,0 +1,351 @@
+const API_BASE = window.location.origin;
+const selectedItems = new Map();
+
+const CUSTOMER_PAGE_SIZE = 50;
+const CUSTOMER_SEARCH_DELAY = 250; // ms
+let allCustomers = [];
+let customerCursor = null;
+let customerSearchTimer = null;
+let allProducts = [];
+let selectedCustomer = null;
+// Idempotency key of the basket being submitted; a retry after a timeout
+// reuses it so the server answers with the original purchase
+let pendingPurchase = null;
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    loadCustomersFromAPI();
+    loadProductsFromAPI();
+});
+
+// Load products from API
+async function loadProductsFromAPI() {
+    try {
+        const response = await fetch(`${API_BASE}/product/all`);
+        const data = await response.json();
+        allProducts = data.products || [];
+        populateItemsChecklist();
+    } catch (error) {
+        console.error('Error loading products:', error);
+        showError('Failed to load products from database');
+    }
+}
+
+// Populate items checklist from products
+function populateItemsChecklist() {
+    const checklist = document.getElementById('itemsChecklist');
+
+    if (allProducts.length === 0) {
+        checklist.innerHTML = '<div style="padding: 10px; text-align: center; color: #999;">No products found</div>';
+        return;
+    }
+
+    checklist.innerHTML = '';
+
+    allProducts.forEach(product => {
+        const div = document.createElement('div');
+        div.className = 'checkbox-item';
+        div.onclick = (e) => toggleItem(e);
+        div.innerHTML = `
+            <input type="checkbox" name="items" value="${product.name}" data-price="${product.price}">
+            <div class="item-info">
+                <span class="item-name">${product.name}</span>
+                <span class="item-price">$${product.price.toFixed(2)}</span>
+            </div>
+        `;
+        checklist.appendChild(div);
+    });
+}
+
+// Load one page of customers matching the search box from the API;
+// append=true fetches the page after the ones already shown
+async function loadCustomersFromAPI(append = false) {
+    const loading = document.getElementById('loadingCustomers');
+    const search = document.getElementById('customerSearch');
+    const q = search.value.trim();
+    const params = new URLSearchParams({ q, limit: CUSTOMER_PAGE_SIZE });
+    if (append && customerCursor) params.set('after', customerCursor);
+
+    if (loading) loading.style.display = 'block';
+
+    try {
+        const response = await fetch(`${API_BASE}/purchase/customers?${params}`);
+        const data = await response.json();
+        // The cashier kept typing; a newer request will fill the list
+        if (q !== search.value.trim()) return;
+        const page = data.customers || [];
+        allCustomers = append ? allCustomers.concat(page) : page;
+        customerCursor = data.next_after;
+        populateCustomerDropdown();
+    } catch (error) {
+        console.error('Error loading customers:', error);
+        showError('Failed to load customers from database');
+    }
+    finally {
+        if (loading) loading.style.display = 'none'; 
+    }
+}
+
+// Populate customer dropdown
+function populateCustomerDropdown() {
+    const dropdown = document.getElementById('customerDropdown');
+
+     if (!dropdown) {
+        console.warn('Dropdown element not found');
+        return; // אם אין dropdown, אין מה לעשות
+    }
+
+    if (allCustomers.length === 0) {
+        dropdown.innerHTML = '<div style="padding: 10px; text-align: center; color: #999;">No customers found</div>';
+        return;
+    }
+
+    dropdown.innerHTML = '';
+
+    allCustomers.forEach(customerId => {
+        const item = document.createElement('div');
+        item.className = 'customer-item';
+        if (customerId === selectedCustomer) item.classList.add('selected');
+        item.textContent = customerId;
+        item.onclick = () => selectCustomer(customerId);
+        dropdown.appendChild(item);
+    });
+
+    if (customerCursor) {
+        const more = document.createElement('div');
+        more.className = 'customer-item';
+        more.style.textAlign = 'center';
+        more.style.color = '#999';
+        more.textContent = 'Load more…';
+        more.onclick = () => loadCustomersFromAPI(true);
+        dropdown.appendChild(more);
+    }
+}
+
+function handleSupermarketChange() {
+    const value = document.getElementById('supermarketId').value;
+    console.log('Selected supermarket:', value);
+}
+
+function handleCustomerTypeChange() {
+    const customerType = document.querySelector('input[name="customerType"]:checked').value;
+    const newCustomerSection = document.getElementById('newCustomerSection');
+    const existingCustomerSection = document.getElementById('existingCustomerSection');
+
+    if (customerType === 'new') {
+        newCustomerSection.classList.remove('hidden-section');
+        existingCustomerSection.classList.add('hidden-section');
+        selectedCustomer = null;
+        document.getElementById('selectedCustomerDisplay').textContent = 'None';
+    } else {
+        newCustomerSection.classList.add('hidden-section');
+        existingCustomerSection.classList.remove('hidden-section');
+    }
+}
+
+// Search on the server as the cashier types, once typing pauses
+function filterCustomers() {
+    clearTimeout(customerSearchTimer);
+    customerSearchTimer = setTimeout(() => loadCustomersFromAPI(), CUSTOMER_SEARCH_DELAY);
+}
+
+function selectCustomer(customerId) {
+    selectedCustomer = customerId;
+    document.getElementById('selectedCustomerDisplay').textContent = customerId;
+
+    const items = document.querySelectorAll('.customer-item');
+    items.forEach(item => {
+        if (item.textContent === customerId) {
+            item.classList.add('selected');
+        } else {
+            item.classList.remove('selected');
+        }
+    });
+
+    document.getElementById('customerSearch').value = '';
+    filterCustomers();
+}
+
+function toggleItem(event) {
+    const checkbox = event.currentTarget.querySelector('input[type="checkbox"]');
+    checkbox.checked = !checkbox.checked;
+    updateSelectedItems();
+}
+
+function updateSelectedItems() {
+    selectedItems.clear();
+    let total = 0;
+
+    const checkboxes = document.querySelectorAll('input[name="items"]:checked');
+    checkboxes.forEach(checkbox => {
+        const itemName = checkbox.value;
+        const itemPrice = parseFloat(checkbox.dataset.price);
+        selectedItems.set(itemName, itemPrice);
+        total += itemPrice;
+    });
+
+    const displayDiv = document.getElementById('selectedItemsDisplay');
+    const tagsDiv = document.getElementById('selectedItemsTags');
+
+    if (selectedItems.size > 0) {
+        displayDiv.classList.remove('hidden');
+        let tagsHTML = '';
+        selectedItems.forEach((price, itemName) => {
+            tagsHTML += `
+                <span class="selected-item-tag">
+                    ${itemName} ($${price.toFixed(2)})
+                    <button type="button" class="remove-item-btn" onclick="removeItem('${itemName}')">×</button>
+                </span>
+            `;
+        });
+        tagsDiv.innerHTML = tagsHTML;
+    } else {
+        displayDiv.classList.add('hidden');
+    }
+
+    document.getElementById('totalAmount').textContent = total.toFixed(2);
+}
+
+function removeItem(itemName) {
+    const checkbox = document.querySelector(`input[name="items"][value="${itemName}"]`);
+    checkbox.checked = false;
+    updateSelectedItems();
+}
+
+async function handleSubmit(event) {
+    event.preventDefault();
+
+    const supermarketId = document.getElementById('supermarketId').value.trim();
+    if (!supermarketId) {
+        showError('Please select a supermarket');
+        return;
+    }
+
+    let customerId = null;
+    const customerType = document.querySelector('input[name="customerType"]:checked').value;
+
+    if (customerType === 'existing') {
+        customerId = selectedCustomer;
+        if (!customerId) {
+            showError('Please select an existing customer');
+            return;
+        }
+    }
+
+    if (selectedItems.size === 0) {
+        showError('Please select at least one item');
+        return;
+    }
+
+    const items = Array.from(selectedItems.keys());
+    const signature = JSON.stringify([supermarketId, customerId, items]);
+    if (!pendingPurchase || pendingPurchase.signature !== signature) {
+        pendingPurchase = { signature, key: newIdempotencyKey() };
+    }
+
+    showLoading(true);
+    hideMessages();
+
+    try {
+        const response = await fetch(`${API_BASE}/purchase/create`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': pendingPurchase.key,
+            },
+            body: JSON.stringify({
+                supermarket_id: supermarketId,
+                user_id: customerId,
+                items_list: items
+            })
+        });
+
+        const data = await response.json();
+
+        if (!response.ok) {
+            throw new Error(data.detail || 'Failed to create purchase');
+        }
+        pendingPurchase = null;
+
+        const total = Array.from(selectedItems.values()).reduce((a, b) => a + b, 0);
+        showSuccessModal(data.purchase_id, data.user_id, total, data.is_new);
+
+        if (data.is_new) {
+           setTimeout(() => loadCustomersFromAPI(), 0);
+        }
+
+        resetForm();
+
+    } catch (error) {
+        showError(`Error: ${error.message}`);
+    } finally {
+        showLoading(false);
+    }
+}
+
+function newIdempotencyKey() {
+    // randomUUID needs a secure context (https or localhost)
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+}
+
+function showSuccessModal(purchaseId, customerId, total, isNew) {
+    document.getElementById('modalPurchaseId').textContent = purchaseId;
+    document.getElementById('modalCustomerId').textContent = customerId;
+    document.getElementById('modalTotalAmount').textContent = total.toFixed(2);
+
+    const badge = document.getElementById('newCustomerBadge');
+    if (isNew) {
+        badge.style.display = 'block';
+    } else {
+        badge.style.display = 'none';
+    }
+
+    document.getElementById('successModal').style.display = 'block';
+}
+
+function closeSuccessModal() {
+    document.getElementById('successModal').style.display = 'none';
+}
+
+window.onclick = function(event) {
+    const modal = document.getElementById('successModal');
+    if (event.target == modal) {
+        modal.style.display = 'none';
+    }
+}
+
+function showError(message) {
+    const el = document.getElementById('errorMessage');
+    el.textContent = message;
+    el.style.display = 'block';
+}
+
+function hideMessages() {
+    document.getElementById('successMessage').style.display = 'none';
+    document.getElementById('errorMessage').style.display = 'none';
+}
+
+function showLoading(show) {
+    document.getElementById('loading').style.display = show ? 'block' : 'none';
+    document.getElementById('submitBtn').disabled = show;
+}
+
+function resetForm() {
+    document.getElementById('purchaseForm').reset();
+    selectedItems.clear();
+    selectedCustomer = null;
+    document.getElementById('selectedCustomerDisplay').textContent = 'None';
+    document.getElementById('selectedItemsDisplay').classList.add('hidden');
+    document.getElementById('totalAmount').textContent = '0.00';
+    document.getElementById('customerSearch').value = '';
+
+    document.querySelector('input[name="customerType"][value="new"]').checked = true;
+    handleCustomerTypeChange();
+
+    document.querySelectorAll('input[name="items"]').forEach(cb => cb.checked = false);
+
+    hideMessages();
+}
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from shared.models.base import Base
+from shared.models.product import Product
+from shared.models.purchase import Purchase
+from cashier.services.purchase_service import PurchaseService
+from cashier.services.product_catalog import ProductCatalog
+from cashier.services.idempotency_cache import IdempotencyCache
+from cashier.controllers import async_purchase_controller
+
+
+async def _with_session(fn):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    ProductCatalog.invalidate()
+    try:
+        async with Session() as db:
+            db.add_all([
+                Product(product_name="bread", unit_price=2.0),
+                Product(product_name="gum", unit_price=0.25),
+            ])
+            await db.commit()
+            return await fn(db)
+    finally:
+        await engine.dispose()
+
+
+def test_async_create_purchase_records_sale():
+    async def scenario(db):
+        purchase, is_new = await db.run_sync(PurchaseService.create_purchase, "s1", "async-user", ["bread", "gum", "gum"])
+        customers = await db.run_sync(PurchaseService.get_all_customers)
+        stored = await db.get(Purchase, purchase.id)
+        return purchase, is_new, customers, stored
+
+    purchase, is_new, customers, stored = asyncio.run(_with_session(scenario))
+    assert is_new is True
+    assert purchase.total_amount == pytest.approx(2.5)
+    assert customers == ["async-user"]
+    assert stored is not None
+
+
+def test_async_create_purchase_rejects_unknown_product():
+    async def scenario(db):
+        with pytest.raises(ValueError) as excinfo:
+            await db.run_sync(PurchaseService.create_purchase, "s1", None, ["caviar"])
+        return str(excinfo.value)
+
+    assert "Unknown product: caviar" in asyncio.run(_with_session(scenario))
+
+
+def test_concurrent_catalog_refreshes_do_not_block_event_loop(tmp_path):
+    # A file database: each session gets its own aiosqlite connection, so the
+    # catalog refresh really awaits I/O while the other requests run
+    url = f"sqlite+aiosqlite:///{tmp_path / 'catalog.db'}"
+
+    async def scenario():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+        async with Session() as db:
+            db.add(Product(product_name="bread", unit_price=2.0))
+            await db.commit()
+        ProductCatalog.invalidate()
+
+        async def snapshot():
+            async with Session() as db:
+                return await db.run_sync(ProductCatalog.snapshot)
+
+        async def checkout(n):
+            async with Session() as db:
+                return await db.run_sync(PurchaseService.checkout, "s1", f"u{n}", ["bread"])
+
+        try:
+            cold = await asyncio.wait_for(asyncio.gather(*(snapshot() for _ in range(3))), 10)
+            # Expired rather than dropped: the refresh runs while the others serve the stale copy
+            ProductCatalog._loaded_at = 0.0
+            sales = await asyncio.wait_for(asyncio.gather(*(checkout(n) for n in range(3))), 10)
+            return cold, sales
+        finally:
+            await engine.dispose()
+
+    cold, sales = asyncio.run(scenario())
+    assert all(json.loads(s.variants["identity"]) == {"products": [{"name": "bread", "price": 2.0}]} for s in cold)
+    assert [s["total_amount"] for s in sales] == [2.0, 2.0, 2.0]
+
+
+def test_async_controller_maps_errors_like_the_sync_one(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'routes.db'}")
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with Session() as db:
+            db.add(Product(product_name="bread", unit_price=2.0))
+            await db.commit()
+
+    async def get_db():
+        async with Session() as db:
+            yield db
+
+    asyncio.run(setup())
+    ProductCatalog.invalidate()
+    IdempotencyCache.clear()
+    app = FastAPI()
+    app.include_router(async_purchase_controller.router)
+    app.dependency_overrides[async_purchase_controller.get_db] = get_db
+    client = TestClient(app)
+
+    sale = {"supermarket_id": "s1", "user_id": "u1", "items_list": ["bread"]}
+    created = client.post("/purchase/create", json=sale, headers={"Idempotency-Key": "k1"})
+    replayed = client.post("/purchase/create", json=sale, headers={"Idempotency-Key": "k1"})
+    reused = client.post("/purchase/create", json={**sale, "items_list": ["bread", "bread"]},
+                         headers={"Idempotency-Key": "k1"})
+    unknown = client.post("/purchase/create", json={**sale, "items_list": ["caviar"]})
+    batch = client.post("/purchase/batch", json=[sale, {**sale, "items_list": ["caviar"]}])
+    customers = client.get("/purchase/customers")
+    asyncio.run(engine.dispose())
+
+    assert created.status_code == 200 and replayed.json()["replayed"] is True
+    assert replayed.json()["purchase_id"] == created.json()["purchase_id"]
+    assert reused.status_code == 422
+    assert unknown.status_code == 400
+    assert (batch.json()["created"], batch.json()["failed"]) == (1, 1)
+    assert customers.json() == {"customers": ["u1"], "next_after": None}
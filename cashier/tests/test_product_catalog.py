@@ -0,0 +1,162 @@
+import gzip
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from shared.models.base import Base
+from shared.models.product import Product
+from cashier.controllers import product_controller
+from cashier.services import product_catalog
+from cashier.services.product_catalog import ProductCatalog
+from cashier.services.purchase_service import PurchaseService
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    ProductCatalog.invalidate()
+    ProductCatalog.reset_stats()
+    return engine
+
+
+@pytest.fixture
+def db_session(engine):
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all([
+        Product(product_name="apple", unit_price=0.5),
+        Product(product_name="banana", unit_price=0.75),
+    ])
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def count_product_selects(engine):
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "products" in statement:
+            statements.append(statement)
+
+    return statements
+
+
+def test_calculate_total_uses_cached_catalog(engine, db_session):
+    PurchaseService.calculate_total(db_session, ["apple"])
+    selects = count_product_selects(engine)
+
+    total = PurchaseService.calculate_total(db_session, ["apple", "banana"] * 20)
+
+    assert total == pytest.approx(20 * (0.5 + 0.75))
+    assert selects == []
+    stats = ProductCatalog.stats()
+    assert stats["refreshes"] == 1
+    assert stats["hits"] == 3
+
+
+def test_unknown_product_is_counted_as_miss(db_session):
+    assert ProductCatalog.get_price(db_session, "kiwi") is None
+    assert ProductCatalog.stats()["misses"] == 1
+
+
+def test_product_added_after_load_is_found_via_fallback(db_session):
+    ProductCatalog.prices(db_session)
+    db_session.add(Product(product_name="kiwi", unit_price=0.3))
+    db_session.commit()
+
+    assert ProductCatalog.get_price(db_session, "kiwi") == pytest.approx(0.3)
+    assert ProductCatalog.get_price(db_session, "kiwi") == pytest.approx(0.3)
+    stats = ProductCatalog.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_miss_fill_does_not_mutate_a_handed_out_snapshot(db_session):
+    prices = ProductCatalog.prices(db_session)
+    db_session.add(Product(product_name="kiwi", unit_price=0.3))
+    db_session.commit()
+
+    # Iterating the snapshot while a miss is filled in must not fail
+    for name in prices:
+        ProductCatalog.get_price(db_session, "kiwi")
+
+    assert "kiwi" not in prices
+    assert ProductCatalog.prices(db_session)["kiwi"] == pytest.approx(0.3)
+
+
+def test_invalidate_route_needs_the_admin_token(monkeypatch):
+    app = FastAPI()
+    app.include_router(product_controller.router)
+    client = TestClient(app)
+    assert client.post("/product/catalog/invalidate").status_code == 404
+
+    monkeypatch.setattr(product_catalog, "PRODUCT_CATALOG_ADMIN_TOKEN", "s3cret")
+    assert client.post("/product/catalog/invalidate").status_code == 403
+    assert client.post("/product/catalog/invalidate", headers={"X-Admin-Token": "nope"}).status_code == 403
+    response = client.post("/product/catalog/invalidate", headers={"X-Admin-Token": "s3cret"})
+    assert response.json() == {"invalidated": True}
+
+
+def test_invalidate_reloads_changed_prices(db_session):
+    assert ProductCatalog.get_price(db_session, "apple") == pytest.approx(0.5)
+    db_session.query(Product).filter(Product.product_name == "apple").update({"unit_price": 0.6})
+    db_session.commit()
+
+    ProductCatalog.invalidate()
+
+    assert ProductCatalog.get_price(db_session, "apple") == pytest.approx(0.6)
+    assert ProductCatalog.stats()["refreshes"] == 2
+
+
+def test_products_lists_catalog(db_session):
+    products = ProductCatalog.products(db_session)
+    assert {"name": "apple", "price": 0.5} in products
+    assert len(products) == 2
+
+
+def test_basket_is_priced_with_one_query_without_cache(engine, db_session, monkeypatch):
+    monkeypatch.setattr(ProductCatalog, "ttl", 0)
+    selects = count_product_selects(engine)
+
+    total = PurchaseService.calculate_total(db_session, ["apple", "banana", "apple", "banana"])
+
+    assert total == pytest.approx(2.5)
+    assert len(selects) == 1
+
+
+def test_snapshot_is_reused_until_prices_change(db_session):
+    first = ProductCatalog.snapshot(db_session)
+    assert json.loads(first.variants["identity"]) == {"products": ProductCatalog.products(db_session)}
+
+    # A TTL refresh that finds the same prices keeps the same bytes and ETag
+    ProductCatalog.refresh(db_session)
+    assert ProductCatalog.snapshot(db_session) is first
+
+    db_session.query(Product).filter(Product.product_name == "apple").update({"unit_price": 0.6})
+    db_session.commit()
+    ProductCatalog.refresh(db_session)
+
+    second = ProductCatalog.snapshot(db_session)
+    assert second.etag != first.etag
+    assert {"name": "apple", "price": 0.6} in json.loads(second.variants["identity"])["products"]
+
+
+def test_snapshot_negotiates_encoding(db_session, monkeypatch):
+    # Make the body large enough that compression pays off
+    db_session.add_all([Product(product_name=f"product-{i}", unit_price=1) for i in range(50)])
+    db_session.commit()
+    snapshot = ProductCatalog.snapshot(db_session)
+
+    assert snapshot.negotiate("gzip, deflate") == "gzip"
+    assert snapshot.negotiate("gzip;q=0") == "identity"
+    assert snapshot.negotiate(None) == "identity"
+    assert gzip.decompress(snapshot.variants["gzip"]) == snapshot.variants["identity"]
+    assert snapshot.variant_etag("gzip") != snapshot.variant_etag("identity")
@@ -1,12 +1,16 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
-from cashier.models.base import Base
-from cashier.models.product import Product
-from cashier.models.user import User
-from cashier.models.purchase import Purchase
+from shared.models.base import Base
+from shared.models.product import Product
+from shared.models.user import User
+from shared.models.purchase import Purchase
+from shared.models.purchase_item import PurchaseItem
+from shared.models.dashboard_summary import UserPurchaseCount, ProductSaleCount, PurchaseCounter
 from cashier.services.purchase_service import PurchaseService
+from cashier.services.product_catalog import ProductCatalog
+from cashier.services.idempotency_cache import IdempotencyCache, IdempotencyKeyReused
 
 
 @pytest.fixture
@@ -15,6 +19,8 @@ def db_session():
     Base.metadata.create_all(engine)
     Session = sessionmaker(bind=engine)
     session = Session()
+    ProductCatalog.invalidate()
+    IdempotencyCache.clear()
     try:
         yield session
     finally:
@@ -90,3 +96,261 @@ def test_create_purchase_with_empty_items_results_in_zero_total(db_session):
     assert purchase.items_list == ""
     assert is_new is True
 
+
+
+def test_calculate_total_reports_all_unknown_products(db_session):
+    db_session.add(Product(product_name="milk", unit_price=1.2))
+    db_session.commit()
+
+    with pytest.raises(ValueError) as excinfo:
+        PurchaseService.calculate_total(db_session, ["eggs", "milk", "jam", "eggs"])
+
+    assert "Unknown products: eggs, jam" in str(excinfo.value)
+
+
+def test_price_items_collapses_duplicates(db_session):
+    db_session.add_all([
+        Product(product_name="gum", unit_price=0.25),
+        Product(product_name="soda", unit_price=1.0),
+    ])
+    db_session.commit()
+
+    total, lines = PurchaseService.price_items(db_session, ["gum", "soda", "gum", "gum"])
+    assert lines == {"gum": (3, 0.25), "soda": (1, 1.0)}
+    assert total == pytest.approx(1.75)
+
+
+def test_create_purchase_with_unknown_product_leaves_no_orphan_user(db_session):
+    with pytest.raises(ValueError):
+        PurchaseService.create_purchase(db_session, "s4", "ghost", ["caviar"])
+
+    assert db_session.query(User).filter(User.user_id == "ghost").one_or_none() is None
+    assert db_session.query(Purchase).count() == 0
+
+
+def test_create_purchase_commits_once(db_session):
+    db_session.add(Product(product_name="tea", unit_price=3.0))
+    db_session.commit()
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+
+    purchase, is_new = PurchaseService.create_purchase(db_session, "s5", None, ["tea"])
+
+    assert len(commits) == 1
+    assert is_new is True
+    assert db_session.query(User).filter(User.user_id == purchase.user_id).one_or_none() is not None
+
+
+def test_new_customer_checkout_does_not_probe_users(db_session):
+    db_session.add(Product(product_name="tea", unit_price=3.0))
+    db_session.commit()
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    PurchaseService.create_purchase(db_session, "s6", None, ["tea"])
+
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT") and "users" in s]
+
+
+def test_insert_user_fallback_detects_existing_user(db_session, monkeypatch):
+    monkeypatch.setattr("shared.sql.CONFLICT_INSERTS", {})
+    db_session.add(User(user_id="known"))
+    db_session.commit()
+
+    assert PurchaseService._insert_user(db_session, "known") is False
+    assert PurchaseService._insert_user(db_session, "fresh") is True
+    db_session.commit()
+    assert db_session.query(User).count() == 2
+
+
+def test_create_purchase_writes_purchase_items(db_session):
+    db_session.add_all([
+        Product(product_name="gum", unit_price=0.25),
+        Product(product_name="tea", unit_price=3.0),
+    ])
+    db_session.commit()
+
+    purchase, _ = PurchaseService.create_purchase(db_session, "s7", None, ["gum", "tea", "gum"])
+
+    rows = db_session.query(PurchaseItem).filter(PurchaseItem.purchase_id == purchase.id).all()
+    assert {(r.product_name, r.quantity, r.unit_price_at_sale) for r in rows} == {("gum", 2, 0.25), ("tea", 1, 3.0)}
+    assert purchase.items_list == "gum,tea,gum"
+
+
+@pytest.mark.parametrize("portable", [False, True])
+def test_create_purchase_updates_dashboard_summary(db_session, monkeypatch, portable):
+    if portable:
+        monkeypatch.setattr("shared.sql.CONFLICT_INSERTS", {})
+    db_session.add_all([
+        Product(product_name="gum", unit_price=0.25),
+        Product(product_name="tea", unit_price=3.0),
+    ])
+    db_session.commit()
+
+    PurchaseService.create_purchase(db_session, "s8", "regular", ["gum", "gum", "tea"])
+    PurchaseService.create_purchase(db_session, "s8", "regular", ["gum"])
+
+    assert db_session.get(UserPurchaseCount, "regular").purchase_count == 2
+    assert db_session.get(ProductSaleCount, "gum").sale_count == 3
+    assert db_session.get(ProductSaleCount, "tea").sale_count == 1
+    assert sum(c.purchase_count for c in db_session.query(PurchaseCounter)) == 2
+
+
+def test_search_customers_pages_through_prefix_matches(db_session):
+    db_session.add_all([User(user_id=u) for u in ["ab1", "ab2", "ab3", "ac1", "b1"]])
+    db_session.commit()
+
+    page, cursor = PurchaseService.search_customers(db_session, q="ab", limit=2)
+    assert page == ["ab1", "ab2"]
+    assert cursor == "ab2"
+
+    page, cursor = PurchaseService.search_customers(db_session, q="ab", after=cursor, limit=2)
+    assert page == ["ab3"]
+    assert cursor is None
+
+
+def test_search_customers_treats_wildcards_literally(db_session):
+    db_session.add_all([User(user_id=u) for u in ["a_1", "ab1", "a%2"]])
+    db_session.commit()
+
+    assert PurchaseService.search_customers(db_session, q="a_")[0] == ["a_1"]
+    assert PurchaseService.search_customers(db_session, q="a%")[0] == ["a%2"]
+    assert PurchaseService.search_customers(db_session)[0] == ["a%2", "a_1", "ab1"]
+
+
+@pytest.mark.parametrize("portable", [False, True])
+def test_create_purchases_reports_results_per_purchase(db_session, monkeypatch, portable):
+    if portable:
+        monkeypatch.setattr("shared.sql.CONFLICT_INSERTS", {})
+    db_session.add_all([Product(product_name="gum", unit_price=0.25), Product(product_name="tea", unit_price=3.0), User(user_id="old")])
+    db_session.commit()
+
+    results = PurchaseService.create_purchases(db_session, [
+        {"supermarket_id": "s1", "user_id": "fresh", "items": ["gum", "gum"]},
+        {"supermarket_id": "s1", "user_id": "fresh", "items": ["tea"]},
+        {"supermarket_id": "s2", "user_id": "old", "items": ["caviar"]},
+        {"supermarket_id": "s2", "user_id": "old", "items": ["tea", "gum"]},
+        {"supermarket_id": "s3", "user_id": None, "items": []},
+    ])
+
+    assert [r["status"] for r in results] == ["created", "created", "error", "created", "created"]
+    assert [r.get("is_new") for r in results] == [True, False, None, False, True]
+    assert results[0]["total_amount"] == pytest.approx(0.5)
+    assert results[2]["error"] == "Unknown product: caviar"
+    assert db_session.query(Purchase).count() == 4
+    assert db_session.get(PurchaseItem, (results[0]["purchase_id"], "gum")).quantity == 2
+    assert db_session.get(UserPurchaseCount, "fresh").purchase_count == 2
+    assert db_session.get(ProductSaleCount, "gum").sale_count == 3
+    assert db_session.get(User, results[4]["user_id"]) is not None
+
+
+def test_create_purchases_prices_once_and_commits_per_chunk(db_session, monkeypatch):
+    monkeypatch.setattr(ProductCatalog, "ttl", 0)
+    db_session.add(Product(product_name="tea", unit_price=3.0))
+    db_session.commit()
+    commits, product_selects = [], []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+    event.listen(db_session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: product_selects.append(statement) if "FROM products" in statement else None)
+
+    results = PurchaseService.create_purchases(
+        db_session, [{"supermarket_id": "s1", "user_id": f"u{i}", "items": ["tea"]} for i in range(5)], chunk_size=2)
+
+    assert all(r["status"] == "created" for r in results)
+    assert len(commits) == 3
+    assert len(product_selects) == 1
+
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_checkout_replays_idempotency_key_without_repricing(db_session, monkeypatch, cached):
+    db_session.add(Product(product_name="tea", unit_price=3.0))
+    db_session.commit()
+
+    first = PurchaseService.checkout(db_session, "s1", None, ["tea", "tea"], idempotency_key="till-1:42")
+    if not cached:
+        IdempotencyCache.clear()
+    monkeypatch.setattr(ProductCatalog, "get_prices", lambda *args: pytest.fail("replay was re-priced"))
+    retry = PurchaseService.checkout(db_session, "s1", None, ["tea", "tea"], idempotency_key="till-1:42")
+
+    assert first["replayed"] is False
+    assert retry == {**first, "replayed": True}
+    assert db_session.query(Purchase).count() == 1
+    assert db_session.get(ProductSaleCount, "tea").sale_count == 2
+
+
+def test_checkout_replays_key_stored_by_concurrent_request(db_session, monkeypatch):
+    db_session.add(Product(product_name="tea", unit_price=3.0))
+    db_session.commit()
+    first = PurchaseService.checkout(db_session, "s1", "u1", ["tea"], idempotency_key="k1")
+    IdempotencyCache.clear()
+    # Both requests miss the lookup; the second one then loses on the key insert
+    lookup = PurchaseService.stored_result
+    misses = iter([None])
+    monkeypatch.setattr(PurchaseService, "stored_result",
+                        lambda db, key, fingerprint=None: next(misses, None) or lookup(db, key, fingerprint))
+
+    retry = PurchaseService.checkout(db_session, "s1", "u1", ["tea"], idempotency_key="k1")
+
+    assert retry["purchase_id"] == first["purchase_id"]
+    assert retry["replayed"] is True
+    assert db_session.query(Purchase).count() == 1
+    assert db_session.get(UserPurchaseCount, "u1").purchase_count == 1
+
+
+def test_create_purchases_skips_used_idempotency_keys(db_session):
+    db_session.add(Product(product_name="tea", unit_price=3.0))
+    db_session.commit()
+    earlier = PurchaseService.checkout(db_session, "s1", "u1", ["tea"], idempotency_key="a")
+    IdempotencyCache.clear()
+
+    results = PurchaseService.create_purchases(db_session, [
+        {"supermarket_id": "s1", "user_id": "u1", "items": ["tea"], "idempotency_key": "a"},
+        {"supermarket_id": "s1", "user_id": "u2", "items": ["tea"], "idempotency_key": "b"},
+        {"supermarket_id": "s1", "user_id": "u2", "items": ["tea"], "idempotency_key": "b"},
+        {"supermarket_id": "s1", "user_id": "u3", "items": ["tea"]},
+    ])
+
+    assert [r["replayed"] for r in results] == [True, False, True, False]
+    assert results[0]["purchase_id"] == earlier["purchase_id"]
+    assert results[2]["purchase_id"] == results[1]["purchase_id"]
+    assert results[2]["index"] == 2
+    assert db_session.query(Purchase).count() == 3
+    assert IdempotencyCache.get("b")[0]["purchase_id"] == results[1]["purchase_id"]
+
+
+def test_idempotency_key_reused_for_another_purchase_is_refused(db_session):
+    db_session.add_all([Product(product_name="tea", unit_price=3.0), Product(product_name="gum", unit_price=0.25)])
+    db_session.commit()
+    first = PurchaseService.checkout(db_session, "s1", "u1", ["tea", "gum"], idempotency_key="k1")
+
+    # Same basket in another order is a retry
+    assert PurchaseService.checkout(db_session, "s1", "u1", ["gum", "tea"], idempotency_key="k1")["replayed"]
+    IdempotencyCache.clear()
+    with pytest.raises(IdempotencyKeyReused):
+        PurchaseService.checkout(db_session, "s1", "u1", ["tea"], idempotency_key="k1")
+    results = PurchaseService.create_purchases(db_session, [
+        {"supermarket_id": "s1", "user_id": "u2", "items": ["tea", "gum"], "idempotency_key": "k1"},
+        {"supermarket_id": "s1", "user_id": "u2", "items": ["tea"], "idempotency_key": "k2"},
+        {"supermarket_id": "s1", "user_id": "u2", "items": ["gum"], "idempotency_key": "k2"},
+    ])
+
+    assert [r["status"] for r in results] == ["error", "created", "error"]
+    assert db_session.query(Purchase).count() == 2
+    assert PurchaseService.stored_result(db_session, "k1")["purchase_id"] == first["purchase_id"]
+
+
+def test_idempotency_cache_entries_expire_with_the_key_retention():
+    IdempotencyCache.put("k", {"purchase_id": "p"}, "h", stored_at=1000.0)
+
+    assert IdempotencyCache.get("k", now=1000.0 + IdempotencyCache.retention - 1) == ({"purchase_id": "p"}, "h")
+    assert IdempotencyCache.get("k", now=1000.0 + IdempotencyCache.retention) is None
+    assert IdempotencyCache.get("k", now=1000.0) is None
+
+
+def test_search_customers_bounds_prefix_range(db_session):
+    db_session.add_all([User(user_id=u) for u in ["a", "az", "az\U0010ffff", "a\ud7ff", "a\ue000", "b"]])
+    db_session.commit()
+
+    assert PurchaseService.search_customers(db_session, q="az")[0] == ["az", "az\U0010ffff"]
+    assert PurchaseService.search_customers(db_session, q="a\ud7ff")[0] == ["a\ud7ff"]
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from shared.models.base import Base
+from shared.models.product import Product
+from shared.models.purchase import Purchase
+from shared.models.dashboard_summary import UserPurchaseCount, ProductSaleCount
+from shared.models.idempotency_key import IdempotencyKey
+from cashier.services.purchase_service import PurchaseService
+from cashier.services.product_catalog import ProductCatalog
+from cashier.services.idempotency_cache import IdempotencyCache, IdempotencyKeyReused
+from cashier.services.write_behind import WriteAheadLog, WriteBehindQueue, QueueFull, WalDirectoryInUse
+
+
+@pytest.fixture
+def Session():
+    # One shared connection so the worker thread sees the test's in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as db:
+        db.add_all([Product(product_name="tea", unit_price=3.0), Product(product_name="gum", unit_price=0.25)])
+        db.commit()
+    ProductCatalog.invalidate()
+    IdempotencyCache.clear()
+    yield Session
+    WriteBehindQueue.stop()
+    engine.dispose()
+
+
+def test_wal_recovers_unreleased_records_and_drops_finished_segments(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), segment_bytes=1)
+    with pytest.raises(WalDirectoryInUse):
+        WriteAheadLog(str(tmp_path))
+    first = wal.append({"n": 1})
+    second = wal.append({"n": 2})
+    assert second == first + 1
+    wal.release({first: 1})
+    assert wal.segments() == [second]
+    wal.close()
+    with open(wal.path(second), "ab") as f:
+        f.write(b'{"n": 3')  # torn by a crash mid-append
+
+    reopened = WriteAheadLog(str(tmp_path))
+    assert [record for _, record in reopened.recover()] == [{"n": 2}]
+    reopened.release({second: 1})
+    assert wal.path(second) not in [reopened.path(s) for s in reopened.segments()]
+    reopened.close()
+
+
+def test_submitted_purchases_are_group_committed(Session, tmp_path):
+    WriteBehindQueue.start(Session, str(tmp_path))
+    with Session() as db:
+        results = [WriteBehindQueue.submit(db, "s1", "u1", ["tea", "gum"]) for _ in range(3)]
+        new_customer = WriteBehindQueue.submit(db, "s1", None, ["gum"])
+        with pytest.raises(ValueError):
+            WriteBehindQueue.submit(db, "s1", "u1", ["caviar"])
+    WriteBehindQueue.stop()
+
+    assert all(r["queued"] for r in results)
+    assert results[0]["total_amount"] == pytest.approx(3.25)
+    assert results[0]["is_new"] is None and new_customer["is_new"] is True
+    with Session() as db:
+        assert db.query(Purchase).count() == 4
+        assert db.get(Purchase, new_customer["purchase_id"]).user_id == new_customer["user_id"]
+        assert db.get(UserPurchaseCount, "u1").purchase_count == 3
+        assert db.get(ProductSaleCount, "gum").sale_count == 4
+    assert WriteBehindQueue.depth() == 0
+
+
+def test_restart_replays_log_without_duplicating_written_purchases(Session, tmp_path):
+    with Session() as db:
+        _, written = WriteBehindQueue.prepare(db, "s1", "u1", ["tea"])
+        _, unwritten = WriteBehindQueue.prepare(db, "s1", "u2", ["gum"], idempotency_key="k1")
+    # The first record reached the database before the crash, the second did not
+    wal = WriteAheadLog(str(tmp_path))
+    wal.append(written)
+    wal.append(unwritten)
+    wal.close()
+    with Session() as db:
+        WriteBehindQueue._write(db, [written], check=False)
+
+    WriteBehindQueue.start(Session, str(tmp_path))
+    WriteBehindQueue.stop()
+
+    with Session() as db:
+        assert {p.id for p in db.query(Purchase)} == {written["purchase_id"], unwritten["purchase_id"]}
+        replay = WriteBehindQueue.submit(db, "s1", "u2", ["gum"], idempotency_key="k1")
+    assert replay["purchase_id"] == unwritten["purchase_id"] and replay["replayed"] is True
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(wal.path(wal._segment + 1)), WriteAheadLog.LOCK_FILE]
+
+
+def test_full_queue_refuses_and_pending_keys_replay(Session, tmp_path, monkeypatch):
+    WriteBehindQueue.start(Session, str(tmp_path))
+    monkeypatch.setattr(WriteBehindQueue, "flush_interval", 1.0)
+    monkeypatch.setattr(WriteBehindQueue, "capacity", 1)
+    with Session() as db:
+        first = WriteBehindQueue.submit(db, "s1", "u1", ["tea"], idempotency_key="k1")
+        assert WriteBehindQueue.submit(db, "s1", "u1", ["tea"], idempotency_key="k1") == {
+            **{k: v for k, v in first.items() if k != "queued"}, "replayed": True}
+        with pytest.raises(QueueFull):
+            WriteBehindQueue.submit(db, "s1", "u1", ["tea"])
+        with pytest.raises(IdempotencyKeyReused):
+            WriteBehindQueue.submit(db, "s1", "u1", ["gum"], idempotency_key="k1")
+
+
+def test_worker_survives_errors_outside_the_commit(Session, tmp_path, monkeypatch):
+    WriteBehindQueue.start(Session, str(tmp_path))
+    calls = []
+
+    def release(counts):
+        calls.append(counts)
+        if len(calls) == 1:
+            raise OSError("disk went away")
+
+    monkeypatch.setattr(WriteBehindQueue._wal, "release", release)
+    with Session() as db:
+        WriteBehindQueue.submit(db, "s1", "u1", ["tea"])
+        deadline = time.monotonic() + 5
+        while not calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        WriteBehindQueue.submit(db, "s1", "u1", ["tea"])
+    WriteBehindQueue.stop()
+
+    assert len(calls) == 2
+    assert WriteBehindQueue.depth() == 0
+    with Session() as db:
+        assert db.query(Purchase).count() == 2
+
+
+def wait_until_written(timeout=5):
+    deadline = time.monotonic() + timeout
+    while WriteBehindQueue.depth() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def dead_letters(directory):
+    with open(os.path.join(directory, WriteAheadLog.DEAD_LETTER_FILE)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_requeues_a_batch_the_worker_failed_on(Session, tmp_path, monkeypatch):
+    WriteBehindQueue.start(Session, str(tmp_path))
+    flush = WriteBehindQueue._flush
+    calls = []
+
+    def failing_once(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("worker bug")
+        return flush(batch)
+
+    monkeypatch.setattr(WriteBehindQueue, "_flush", failing_once)
+    with Session() as db:
+        WriteBehindQueue.submit(db, "s1", "u1", ["tea"])
+    wait_until_written()
+
+    assert len(calls) == 2
+    with Session() as db:
+        assert db.query(Purchase).count() == 1
+
+
+def test_failing_purchase_is_dead_lettered_without_blocking_others(Session, tmp_path, monkeypatch):
+    WriteBehindQueue.start(Session, str(tmp_path))
+    monkeypatch.setattr(WriteBehindQueue, "max_retries", 2)
+    monkeypatch.setattr(WriteBehindQueue, "flush_interval", 0.2)
+    write_purchases = PurchaseService.write_purchases
+
+    def reject_bad(db, chunk):
+        if any(record["user_id"] == "bad" for _, record, _, _ in chunk):
+            raise ValueError("value too long")
+        return write_purchases(db, chunk)
+
+    monkeypatch.setattr(PurchaseService, "write_purchases", reject_bad)
+    with Session() as db:
+        bad = WriteBehindQueue.submit(db, "s1", "bad", ["tea"])
+        good = WriteBehindQueue.submit(db, "s1", "u1", ["gum"])
+    wait_until_written()
+
+    with Session() as db:
+        assert [p.id for p in db.query(Purchase)] == [good["purchase_id"]]
+    [letter] = dead_letters(tmp_path)
+    assert letter["record"]["purchase_id"] == bad["purchase_id"]
+    assert letter["reason"] == "ValueError: value too long"
+    assert WriteBehindQueue.stats() == {"committed": 1, "dead_lettered": 1, "superseded": 0, "depth": 0}
+
+
+def test_purchase_superseded_by_another_process_is_recorded(Session, tmp_path):
+    WriteBehindQueue.start(Session, str(tmp_path))
+    with Session() as db:
+        _, record = WriteBehindQueue.prepare(db, "s1", "u1", ["tea"], idempotency_key="k1")
+        db.add(IdempotencyKey(key="k1", purchase_id="elsewhere", user_id="u1", is_new=False, total_amount=3.0))
+        db.commit()
+        assert WriteBehindQueue._write(db, [record], check=True) == 0
+
+    [letter] = dead_letters(tmp_path)
+    assert letter["record"]["purchase_id"] == record["purchase_id"]
+    assert letter["reason"] == "superseded by elsewhere"
+    assert WriteBehindQueue.stats()["superseded"] == 1
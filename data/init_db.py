@@ -1,17 +1,32 @@
+import argparse
 import time
 import csv
+import io
 import os
+from datetime import datetime, timezone
+from collections import Counter
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, text, update
 from sqlalchemy.exc import OperationalError
 
-from cashier.database import engine
-from cashier.models.base import Base
-from cashier.models.user import User
-from cashier.models.product import Product
-from cashier.models.purchase import Purchase
+from cashier.database import maintenance_engine as engine
+from shared.models.base import Base
+from shared.models.user import User
+from shared.models.product import Product
+from shared.models.purchase import Purchase
+from shared.models.purchase_item import PurchaseItem
+from shared.models.dashboard_summary import UserPurchaseCount, ProductSaleCount
+from shared.models.data_backfill import DataBackfill
+from shared.sql import conflict_insert
+from shared.notifications import bump_dashboard_epoch
+from shared.idempotency import IDEMPOTENCY_KEY_RETENTION_DAYS, purge_idempotency_keys
+from shared.partitioning import PURCHASES_PARTITIONED, convert_to_partitioned, ensure_partitions, is_partitioned
 
 DATA_DIR = os.path.dirname(__file__)
+ALEMBIC_INI = os.path.join(DATA_DIR, os.pardir, "alembic.ini")
+
+# CSV rows buffered per bulk insert; bounds loader memory regardless of file size
+CHUNK_SIZE = int(os.getenv("INIT_DB_CHUNK_SIZE", "10000"))
 
 
 def wait_for_db(max_retries=10, delay=2):
@@ -27,49 +42,309 @@ def wait_for_db(max_retries=10, delay=2):
     raise Exception("Database is not available after retries.")
 
 
-def init_db():
+def parse_timestamp(value):
+    """CSV timestamps carry no offset; they are recorded in UTC"""
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def purchase_item_rows(purchase_id, items_list, prices):
+    """Expand a comma-joined items_list into purchase_items rows.
+
+    The CSV has no historical prices, so the current catalog price is used
+    as unit_price_at_sale.
+    """
+    quantities = Counter(item.strip() for item in items_list.split(",") if item.strip())
+    return [
+        {
+            "purchase_id": purchase_id,
+            "product_name": name,
+            "quantity": qty,
+            "unit_price_at_sale": prices.get(name, 0.0),
+        }
+        for name, qty in quantities.items()
+    ]
+
+
+class Throughput:
+    """Prints a rows/sec progress line per chunk and a final summary"""
+
+    def __init__(self, label):
+        self.label = label
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def add(self, n):
+        self.rows += n
+        elapsed = time.perf_counter() - self.start
+        print(f"  {self.label}: {self.rows:,} rows ({self.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    def done(self):
+        elapsed = time.perf_counter() - self.start
+        print(f"{self.label}: loaded {self.rows:,} rows in {elapsed:.2f}s "
+              f"({self.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def copy_rows(conn, table, rows):
+    """Stream rows into a table with COPY FROM STDIN (PostgreSQL only)"""
+    columns = [c.name for c in table.columns if c.name in rows[0]]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([row[c] for c in columns])
+    buf.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(conn, table, rows):
+    """Bulk-insert a chunk: COPY on PostgreSQL, executemany elsewhere"""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        copy_rows(conn, table, rows)
+    else:
+        conn.execute(insert(table), rows)
+
+
+def insert_users(conn, user_ids):
+    """Insert the users of a chunk, skipping ids loaded by earlier chunks"""
+    if not user_ids:
+        return
+    rows = [{"user_id": uid} for uid in sorted(user_ids)]
+    dialect_insert = conflict_insert(conn)
+    if dialect_insert is not None:
+        conn.execute(dialect_insert(User.__table__).on_conflict_do_nothing(index_elements=["user_id"]), rows)
+        return
+    existing = set(conn.execute(
+        select(User.user_id).where(User.user_id.in_(user_ids))
+    ).scalars())
+    rows = [row for row in rows if row["user_id"] not in existing]
+    if rows:
+        conn.execute(insert(User.__table__), rows)
+
+
+def upsert_products(conn, path):
+    """Insert missing products and update prices that changed in the CSV"""
+    with open(path, encoding='utf-8-sig') as f:
+        prices = {row["product_name"]: float(row["unit_price"]) for row in csv.DictReader(f)}
+    rows = [{"product_name": name, "unit_price": price} for name, price in prices.items()]
+
+    dialect_insert = conflict_insert(conn)
+    if dialect_insert is not None:
+        stmt = dialect_insert(Product.__table__)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=["product_name"],
+            set_={"unit_price": stmt.excluded.unit_price},
+            where=Product.__table__.c.unit_price != stmt.excluded.unit_price,
+        ), rows)
+    else:
+        existing = dict(conn.execute(select(Product.product_name, Product.unit_price)).all())
+        for row in rows:
+            if row["product_name"] not in existing:
+                conn.execute(insert(Product.__table__), row)
+            elif existing[row["product_name"]] != row["unit_price"]:
+                conn.execute(update(Product.__table__)
+                             .where(Product.__table__.c.product_name == row["product_name"])
+                             .values(unit_price=row["unit_price"]))
+    print(f"products: upserted {len(prices)} rows")
+    return prices
+
+
+def load_purchases(conn, path, prices, chunk_size=CHUNK_SIZE):
+    """Stream purchases.csv in chunks of `chunk_size` rows.
+
+    Only one chunk of purchases, purchase_items and user ids is held in
+    memory at a time, whatever the size of the file.
+    """
+    purchases = Throughput("purchases")
+
+    def flush(purchase_rows, item_rows, user_ids):
+        insert_users(conn, user_ids)
+        insert_rows(conn, Purchase.__table__, purchase_rows)
+        insert_rows(conn, PurchaseItem.__table__, item_rows)
+        purchases.add(len(purchase_rows))
+
+    purchase_rows, item_rows, user_ids = [], [], set()
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for idx, row in enumerate(csv.DictReader(f)):
+            purchase_id = str(idx)
+            purchase_rows.append({
+                "id": purchase_id,
+                "supermarket_id": row["supermarket_id"],
+                "timestamp": parse_timestamp(row["timestamp"]),
+                "user_id": row["user_id"],
+                "items_list": row["items_list"],
+                "total_amount": float(row["total_amount"]),
+            })
+            item_rows.extend(purchase_item_rows(purchase_id, row["items_list"], prices))
+            user_ids.add(row["user_id"])
+            if len(purchase_rows) >= chunk_size:
+                flush(purchase_rows, item_rows, user_ids)
+                purchase_rows, item_rows, user_ids = [], [], set()
+    if purchase_rows:
+        flush(purchase_rows, item_rows, user_ids)
+    purchases.done()
+
 
+def rebuild_dashboard_summaries(conn):
+    """Recompute the owner dashboard summary tables from purchase history"""
+    conn.execute(delete(UserPurchaseCount.__table__))
+    conn.execute(delete(ProductSaleCount.__table__))
+    conn.execute(text(
+        "INSERT INTO user_purchase_counts (user_id, purchase_count) "
+        "SELECT user_id, COUNT(*) FROM purchases GROUP BY user_id"
+    ))
+    conn.execute(text(
+        "INSERT INTO product_sale_counts (product_name, sale_count) "
+        "SELECT product_name, SUM(quantity) FROM purchase_items GROUP BY product_name"
+    ))
+    # A reload can end on the same totals; make owners drop cached results anyway
+    bump_dashboard_epoch(conn)
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def stamp_schema():
+    """Mark the freshly created schema as current for Alembic migrations"""
+    from alembic import command
+
+    config = alembic_config()
+    with engine.connect() as conn:
+        config.attributes["connection"] = conn
+        command.stamp(config, "head")
+
+
+def migrate_schema():
+    """Create missing tables / apply pending migrations; never drops data.
+
+    Returns False without touching the schema when it is already at head.
+    """
+    from alembic import command
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+        # End the read's implicit transaction so Alembic owns the upgrade's
+        conn.rollback()
+        if current == head:
+            print(f"Schema is current (revision {head})")
+            return False
+        print(f"Migrating schema from {current or 'empty'} to {head}...")
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+    return True
+
+
+def maintain_partitions():
+    """Partition purchases when PURCHASES_PARTITIONED is set, and keep
+    upcoming monthly partitions created once it is partitioned"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            created = ensure_partitions(conn)
+            if created:
+                print(f"Created purchases partitions: {', '.join(created)}")
+        elif PURCHASES_PARTITIONED:
+            print("Converting purchases to monthly partitions...")
+            convert_to_partitioned(conn)
+
+
+def has_rows(conn, model):
+    return conn.execute(select(model).limit(1)).first() is not None
+
+
+def backfill_done(conn, name):
+    return conn.execute(select(DataBackfill.name).where(DataBackfill.name == name)).first() is not None
+
+
+def mark_backfilled(conn, name):
+    """Record a completed backfill; call it in the backfill's transaction"""
+    if not backfill_done(conn, name):
+        conn.execute(insert(DataBackfill.__table__).values(name=name))
+
+
+def backfill_purchase_items(conn, prices, chunk_size=CHUNK_SIZE):
+    """Create purchase_items for purchases recorded before that table existed"""
+    items = Throughput("purchase_items backfill")
+    result = conn.execution_options(yield_per=chunk_size).execute(
+        select(Purchase.id, Purchase.items_list)
+    )
+    for partition in result.partitions():
+        rows = []
+        for purchase_id, items_list in partition:
+            rows.extend(purchase_item_rows(purchase_id, items_list or "", prices))
+        insert_rows(conn, PurchaseItem.__table__, rows)
+        items.add(len(rows))
+    items.done()
+
+
+def init_db(chunk_size=CHUNK_SIZE, reset=False):
+    """Bring the database up to date and load seed data if it is missing.
+
+    By default this is non-destructive and safe to run on every container
+    start: pending migrations are applied, product prices from the CSV are
+    upserted, and purchases are only loaded into an empty database. With
+    reset=True every table is dropped and reloaded from the CSVs.
+    """
     print("Waiting for database...")
     wait_for_db()
 
-    print("Creating tables...")
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-
-    session = Session(bind=engine)
-
-    # Load products
-    with open(os.path.join(DATA_DIR, "products_list.csv"), encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            session.add(Product(
-                product_name=row["product_name"],
-                unit_price=float(row["unit_price"])
-            ))
-
-    # Load purchases + unique users
-    users = set()
-    with open(os.path.join(DATA_DIR, "purchases.csv"), encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for idx, row in enumerate(reader):
-            session.add(Purchase(
-                id=str(idx),
-                supermarket_id=row["supermarket_id"],
-                timestamp=row["timestamp"],
-                user_id=row["user_id"],
-                items_list=row["items_list"],
-                total_amount=float(row["total_amount"]),
-            ))
-            users.add(row["user_id"])
-
-    # Insert users
-    for uid in users:
-        session.add(User(user_id=uid))
-
-    session.commit()
-    session.close()
-    print("DB initialization complete!")
+    if reset:
+        print("Resetting database: dropping and recreating all tables...")
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        stamp_schema()
+    else:
+        migrate_schema()
+    maintain_partitions()
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        prices = upsert_products(conn, os.path.join(DATA_DIR, "products_list.csv"))
+        if reset or not has_rows(conn, Purchase.id):
+            load_purchases(conn, os.path.join(DATA_DIR, "purchases.csv"), prices, chunk_size)
+            mark_backfilled(conn, DataBackfill.PURCHASE_ITEMS)
+            rebuild_dashboard_summaries(conn)
+        else:
+            print("Purchases already present, skipping seed purchases")
+            # Databases created before purchase_items / the summary tables.
+            # The marker, not an empty table, says whether the line items were
+            # derived yet: migration 0011 sets it unless purchases exist
+            # without line items, and it commits together with the backfill
+            if not backfill_done(conn, DataBackfill.PURCHASE_ITEMS):
+                backfill_purchase_items(conn, prices, chunk_size)
+                mark_backfilled(conn, DataBackfill.PURCHASE_ITEMS)
+            if not has_rows(conn, UserPurchaseCount.user_id):
+                print("Rebuilding dashboard summaries...")
+                rebuild_dashboard_summaries(conn)
+        purged = purge_idempotency_keys(conn)
+        if purged:
+            print(f"Purged {purged} idempotency keys older than {IDEMPOTENCY_KEY_RETENTION_DAYS} days")
+    print(f"DB initialization complete in {time.perf_counter() - start:.2f}s!")
 
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create/migrate the schema and load the CSV seed data")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="CSV rows loaded per batch (default %(default)s)")
+    parser.add_argument("--reset", action="store_true",
+                        help="drop all tables and reload everything (destroys sales data)")
+    args = parser.parse_args()
+    init_db(chunk_size=args.chunk_size, reset=args.reset)
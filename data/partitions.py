@@ -0,0 +1,51 @@
+"""
+Manage monthly partitions of the purchases table (PostgreSQL only).
+
+    python data/partitions.py convert            # one-off: partition an existing purchases table
+    python data/partitions.py ensure [--ahead 3] # create upcoming monthly partitions
+    python data/partitions.py detach --older-than 24 [--drop]
+    python data/partitions.py status
+"""
+import argparse
+
+from cashier.database import maintenance_engine as engine
+from shared.partitioning import (
+    PARTITION_MONTHS_AHEAD, convert_to_partitioned, detach_partitions,
+    ensure_partitions, is_partitioned, list_partitions,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="rebuild purchases as a partitioned table")
+    convert.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    ensure = sub.add_parser("ensure", help="create partitions for upcoming months")
+    ensure.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    detach = sub.add_parser("detach", help="detach partitions older than N months")
+    detach.add_argument("--older-than", type=int, required=True, metavar="MONTHS")
+    detach.add_argument("--drop", action="store_true", help="drop detached partitions (deletes their purchases)")
+    sub.add_parser("status", help="list partitions")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("partitioning requires PostgreSQL")
+
+    with engine.begin() as conn:
+        if args.command == "convert":
+            converted = convert_to_partitioned(conn, args.ahead)
+            print("purchases converted" if converted else "purchases is already partitioned")
+        elif not is_partitioned(conn):
+            parser.error("purchases is not partitioned; run 'convert' first")
+        elif args.command == "ensure":
+            print(f"created: {', '.join(ensure_partitions(conn, args.ahead)) or 'nothing'}")
+        elif args.command == "detach":
+            print(f"{'dropped' if args.drop else 'detached'}: "
+                  f"{', '.join(detach_partitions(conn, args.older_than, args.drop)) or 'nothing'}")
+        else:
+            for name in list_partitions(conn):
+                print(name)
+
+
+if __name__ == "__main__":
+    main()
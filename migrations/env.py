@@ -0,0 +1,59 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from shared.settings import settings
+# shared.models imports every model, so Base.metadata holds all tables
+from shared.models import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=settings.url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Called programmatically (e.g. data/init_db.py) with an open connection
+        # that is not inside a transaction, so Alembic owns the transactions
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # 0002 builds indexes CONCURRENTLY in an autocommit block
+            transaction_per_migration=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(settings.url, **settings.engine_kwargs(maintenance=True))
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # 0002 builds indexes CONCURRENTLY in an autocommit block
+            transaction_per_migration=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,70 @@
+"""Initial schema: users, products, purchases, purchase_items and dashboard summaries
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("user_id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "products",
+        sa.Column("product_name", sa.String(), primary_key=True),
+        sa.Column("unit_price", sa.Float(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "purchases",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("supermarket_id", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.user_id"), nullable=True),
+        sa.Column("items_list", sa.String(), nullable=True),
+        sa.Column("total_amount", sa.Float(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "purchase_items",
+        sa.Column("purchase_id", sa.String(), sa.ForeignKey("purchases.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("product_name", sa.String(), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("unit_price_at_sale", sa.Float(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_purchase_items_product_name", "purchase_items", ["product_name"], if_not_exists=True)
+    op.create_table(
+        "user_purchase_counts",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.user_id"), primary_key=True),
+        sa.Column("purchase_count", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_user_purchase_counts_purchase_count", "user_purchase_counts", ["purchase_count"], if_not_exists=True)
+    op.create_table(
+        "product_sale_counts",
+        sa.Column("product_name", sa.String(), primary_key=True),
+        sa.Column("sale_count", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("product_sale_counts")
+    op.drop_table("user_purchase_counts")
+    op.drop_table("purchase_items")
+    op.drop_table("purchases")
+    op.drop_table("products")
+    op.drop_table("users")
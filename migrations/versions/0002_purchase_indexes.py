@@ -0,0 +1,40 @@
+"""Indexes for dashboard queries on purchases
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from shared.sql import drop_invalid_index
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_purchases_user_id", ["user_id"]),
+    ("ix_purchases_timestamp", ["timestamp"]),
+    ("ix_purchases_supermarket_id_timestamp", ["supermarket_id", "timestamp"]),
+]
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        # CONCURRENTLY keeps the cashier writing while large tables are indexed;
+        # it cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                # An interrupted concurrent build leaves an INVALID index under
+                # this name, which IF NOT EXISTS would keep forever
+                drop_invalid_index(op.get_bind(), name)
+                op.create_index(name, "purchases", columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, "purchases", columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="purchases", if_exists=True)
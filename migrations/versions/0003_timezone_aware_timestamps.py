@@ -0,0 +1,46 @@
+"""Timezone-aware timestamps with server-side defaults
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [("purchases", "timestamp"), ("users", "created_at")]
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        for table, column in COLUMNS:
+            # Existing values were written with datetime.utcnow()
+            op.alter_column(
+                table, column,
+                type_=sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                postgresql_using=f'"{column}" AT TIME ZONE \'UTC\'',
+            )
+    else:
+        for table, column in COLUMNS:
+            with op.batch_alter_table(table) as batch:
+                batch.alter_column(column, type_=sa.DateTime(timezone=True), server_default=sa.func.now())
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        for table, column in COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=sa.DateTime(),
+                server_default=None,
+                postgresql_using=f'"{column}" AT TIME ZONE \'UTC\'',
+            )
+    else:
+        for table, column in COLUMNS:
+            with op.batch_alter_table(table) as batch:
+                batch.alter_column(column, type_=sa.DateTime(), server_default=None)
@@ -0,0 +1,33 @@
+"""Prefix-search index on users.user_id
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from shared.sql import drop_invalid_index
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+NAME = "ix_users_user_id_pattern"
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            drop_invalid_index(op.get_bind(), NAME)
+            op.create_index(
+                NAME, "users", ["user_id"],
+                postgresql_ops={"user_id": "varchar_pattern_ops"},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+    else:
+        op.create_index(NAME, "users", ["user_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index(NAME, table_name="users", if_exists=True)
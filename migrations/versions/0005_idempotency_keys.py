@@ -0,0 +1,32 @@
+"""Client idempotency keys for purchase submission
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("purchase_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("is_new", sa.Boolean(), nullable=False),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_idempotency_keys_created_at", "idempotency_keys", ["created_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_idempotency_keys_created_at", table_name="idempotency_keys", if_exists=True)
+    op.drop_table("idempotency_keys")
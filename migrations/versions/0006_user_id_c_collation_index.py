@@ -0,0 +1,49 @@
+"""Replace the user_id pattern_ops index with a COLLATE "C" index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+varchar_pattern_ops serves LIKE 'q%' but not the ORDER BY user_id and
+user_id > :after of the keyset-paginated customer search under a non-C
+collation. An index on (user_id COLLATE "C") serves all three. SQLite
+compares bytewise already and needs neither.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from shared.sql import drop_invalid_index
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+NAME = "ix_users_user_id_c"
+OLD_NAME = "ix_users_user_id_pattern"
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            drop_invalid_index(op.get_bind(), NAME)
+            op.create_index(
+                NAME, "users", [sa.text('user_id COLLATE "C"')],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(OLD_NAME, table_name="users", postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(OLD_NAME, table_name="users", if_exists=True)
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                OLD_NAME, "users", ["user_id"],
+                postgresql_ops={"user_id": "varchar_pattern_ops"},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(NAME, table_name="users", postgresql_concurrently=True, if_exists=True)
+    else:
+        op.create_index(OLD_NAME, "users", ["user_id"], if_not_exists=True)
@@ -0,0 +1,26 @@
+"""Purchase counter slots for the owner dashboard cache version
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "purchase_counters",
+        sa.Column("slot", sa.Integer(), primary_key=True),
+        sa.Column("purchase_count", sa.BigInteger(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("purchase_counters")
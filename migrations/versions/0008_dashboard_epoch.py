@@ -0,0 +1,26 @@
+"""Dashboard epoch for the owner cache version
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "dashboard_epoch",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("epoch", sa.String(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("dashboard_epoch")
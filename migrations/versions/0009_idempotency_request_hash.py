@@ -0,0 +1,22 @@
+"""Request hash on idempotency keys
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing keys keep NULL and replay as before
+    op.add_column("idempotency_keys", sa.Column("request_hash", sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("idempotency_keys", "request_hash")
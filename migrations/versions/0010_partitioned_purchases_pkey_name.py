@@ -0,0 +1,35 @@
+"""Give a converted purchases table's primary key its usual name
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+shared.partitioning.convert_to_partitioned used to add the primary key
+without a name while the renamed old table still owned purchases_pkey, so
+PostgreSQL called it purchases_pkey1. Rename it so later migrations can
+refer to purchases_pkey whether or not the table was converted.
+"""
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.execute(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'purchases'::regclass "
+        "AND contype = 'p' AND conname = 'purchases_pkey1') "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'purchases_pkey') THEN "
+        "ALTER TABLE purchases RENAME CONSTRAINT purchases_pkey1 TO purchases_pkey; "
+        "END IF; END $$"
+    )
+
+
+def downgrade():
+    # The old name was an accident; nothing to restore
+    pass
@@ -0,0 +1,34 @@
+"""Markers for one-off data backfills
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "data_backfills",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        if_not_exists=True,
+    )
+    # Databases whose purchase_items are already filled (or that have no
+    # purchases yet) must not be backfilled again; only a database with
+    # purchases but no line items is left for data/init_db.py to backfill once
+    op.execute(
+        "INSERT INTO data_backfills (name) "
+        "SELECT 'purchase_items' "
+        "WHERE EXISTS (SELECT 1 FROM purchase_items) OR NOT EXISTS (SELECT 1 FROM purchases)"
+    )
+
+
+def downgrade():
+    op.drop_table("data_backfills")
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from owner.db import AsyncSessionLocal
+from owner.controllers.dashboard_controller import (
+    dashboard_window, loyal_buyers_payload, summary_payload, top_products_payload, unique_buyers_payload,
+)
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["owner"]
+)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@router.get("/unique-buyers")
+async def unique_buyers(
+    request: Request,
+    response: Response,
+    window: dict = Depends(dashboard_window),
+    db: AsyncSession = Depends(get_db),
+):
+    return await db.run_sync(unique_buyers_payload, request, response, window)
+
+
+@router.get("/loyal-buyers")
+async def loyal_buyers(
+    request: Request,
+    response: Response,
+    min_purchases: int = Query(3, ge=1),
+    window: dict = Depends(dashboard_window),
+    db: AsyncSession = Depends(get_db),
+):
+    return await db.run_sync(loyal_buyers_payload, request, response, min_purchases, window)
+
+
+@router.get("/top-products")
+async def top_products(
+    request: Request,
+    response: Response,
+    top_n: int = Query(3, ge=1, le=100),
+    window: dict = Depends(dashboard_window),
+    db: AsyncSession = Depends(get_db),
+):
+    return await db.run_sync(top_products_payload, request, response, top_n, window)
+
+
+@router.get("/summary")
+async def summary(
+    request: Request,
+    response: Response,
+    min_purchases: int = Query(3, ge=1),
+    top_n: int = Query(3, ge=1, le=100),
+    window: dict = Depends(dashboard_window),
+    db: AsyncSession = Depends(get_db),
+):
+    """unique-buyers, loyal-buyers and top-products in a single response"""
+    return await db.run_sync(summary_payload, request, response, min_purchases, top_n, window)
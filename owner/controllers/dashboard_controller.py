@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from owner.db import SessionLocal
 from owner.services.dashboard_service import PurchaseService
+from owner.services.dashboard_cache import DashboardCache
+from shared.http_cache import etag_matches, not_modified
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +15,9 @@ router = APIRouter(
     tags=["owner"]
 )
 
+# Browsers keep the response but revalidate it with If-None-Match every time
+CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
 
 def get_db():
     db = SessionLocal()
@@ -20,37 +27,145 @@ def get_db():
         db.close()
 
 
-@router.get("/unique-buyers")
-def unique_buyers(db: Session = Depends(get_db)):
+def dashboard_window(
+    start: Optional[datetime] = Query(None, alias="from", description="Inclusive start (ISO 8601, UTC if no offset)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Exclusive end (ISO 8601, UTC if no offset)"),
+    supermarket_id: Optional[str] = Query(None),
+):
+    """Optional window shared by every dashboard endpoint; empty means all time"""
+    return {"start": start, "end": end, "supermarket_id": supermarket_id}
+
+
+def cached(request: Request, response: Response, db: Session, compute):
+    """Serve compute() through DashboardCache with ETag / If-None-Match.
+
+    A matching If-None-Match is answered with 304 before any result is
+    computed; while the data version is fresh this needs no database access.
+    """
+    version = DashboardCache.version(db)
+    key = DashboardCache.key(request.url.path, request.query_params.multi_items())
+    etag = DashboardCache.etag(key, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, CACHE_HEADERS)
+    payload = DashboardCache.get(key, version)
+    if payload is None:
+        payload = DashboardCache.put(key, version, compute())
+    response.headers.update({"ETag": etag, **CACHE_HEADERS})
+    return payload
+
+
+# Endpoint bodies shared with async_dashboard_controller, which runs them on
+# its AsyncSession through run_sync
+
+
+def unique_buyers_payload(db: Session, request: Request, response: Response, window: dict):
     try:
         logger.info("Received request: GET /dashboard/unique-buyers")
-        count = PurchaseService.unique_buyers(db)
-        logger.info(f"Returning unique buyers count: {count}")
-        return {"unique_buyers": count}
+
+        def compute():
+            count = PurchaseService.unique_buyers(db, **window)
+            logger.info("Returning unique buyers count: %s", count)
+            return {"unique_buyers": count}
+
+        return cached(request, response, db, compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Error while fetching unique buyers")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/loyal-buyers")
-def loyal_buyers(db: Session = Depends(get_db)):
+def loyal_buyers_payload(db: Session, request: Request, response: Response, min_purchases: int, window: dict):
     try:
         logger.info("Received request: GET /dashboard/loyal-buyers")
-        rows = PurchaseService.loyal_buyers(db)
-        logger.info(f"Returning loyal buyers rows: {len(rows)}")
-        return {"loyal_buyers": rows}
+
+        def compute():
+            rows = PurchaseService.loyal_buyers(db, min_purchases, **window)
+            logger.info("Returning loyal buyers rows: %s", len(rows))
+            return {"loyal_buyers": rows}
+
+        return cached(request, response, db, compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Error while fetching loyal buyers")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/top-products")
-def top_products(db: Session = Depends(get_db)):
+def top_products_payload(db: Session, request: Request, response: Response, top_n: int, window: dict):
     try:
         logger.info("Received request: GET /dashboard/top-products")
-        rows = PurchaseService.top_products(db)
-        logger.info(f"Returning top products rows: {len(rows)}")
-        return {"top_products": rows}
+
+        def compute():
+            rows = PurchaseService.top_products(db, top_n, **window)
+            logger.info("Returning top products rows: %s", len(rows))
+            return {"top_products": rows}
+
+        return cached(request, response, db, compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Error while fetching top products")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def summary_payload(db: Session, request: Request, response: Response, min_purchases: int, top_n: int, window: dict):
+    try:
+        logger.info("Received request: GET /dashboard/summary")
+
+        def compute():
+            result = PurchaseService.summary(db, min_purchases, top_n, **window)
+            logger.info("Returning dashboard summary")
+            return result
+
+        return cached(request, response, db, compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error while fetching dashboard summary")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/unique-buyers")
+def unique_buyers(
+    request: Request,
+    response: Response,
+    window: dict = Depends(dashboard_window),
+    db: Session = Depends(get_db),
+):
+    return unique_buyers_payload(db, request, response, window)
+
+
+@router.get("/loyal-buyers")
+def loyal_buyers(
+    request: Request,
+    response: Response,
+    min_purchases: int = Query(3, ge=1),
+    window: dict = Depends(dashboard_window),
+    db: Session = Depends(get_db),
+):
+    return loyal_buyers_payload(db, request, response, min_purchases, window)
+
+
+@router.get("/top-products")
+def top_products(
+    request: Request,
+    response: Response,
+    top_n: int = Query(3, ge=1, le=100),
+    window: dict = Depends(dashboard_window),
+    db: Session = Depends(get_db),
+):
+    return top_products_payload(db, request, response, top_n, window)
+
+
+@router.get("/summary")
+def summary(
+    request: Request,
+    response: Response,
+    min_purchases: int = Query(3, ge=1),
+    top_n: int = Query(3, ge=1, le=100),
+    window: dict = Depends(dashboard_window),
+    db: Session = Depends(get_db),
+):
+    """unique-buyers, loyal-buyers and top-products in a single response"""
+    return summary_payload(db, request, response, min_purchases, top_n, window)
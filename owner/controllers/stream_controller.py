@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from owner.services.dashboard_cache import DashboardCache
+from owner.services.dashboard_stream import DashboardStream
+from owner.controllers.dashboard_controller import dashboard_window
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["owner"]
+)
+
+# Seconds between keep-alive comments so idle proxies keep the stream open
+KEEPALIVE_SECONDS = 15
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    min_purchases: int = Query(3, ge=1),
+    top_n: int = Query(3, ge=1, le=100),
+    days: Optional[float] = Query(None, gt=0, description="Relative window: the last N days as of each push"),
+    window: dict = Depends(dashboard_window),
+):
+    """Server-Sent Events: the /summary payload now, then again whenever it changes"""
+    logger.info("Received request: GET /dashboard/stream")
+    if days is not None and window["start"] is not None:
+        raise HTTPException(status_code=400, detail="Pass either from or days, not both")
+    params = {"min_purchases": min_purchases, "top_n": top_n, **window, "days": days}
+    try:
+        initial = await asyncio.to_thread(DashboardStream.compute, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error while starting dashboard stream")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    key = DashboardCache.key(request.url.path, request.query_params.multi_items())
+    queue = DashboardStream.subscribe(key, params)
+
+    async def events():
+        try:
+            yield DashboardStream.format_event(initial)
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield DashboardStream.format_event(payload)
+        finally:
+            DashboardStream.unsubscribe(key, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
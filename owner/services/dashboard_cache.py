@@ -0,0 +1,88 @@
+import os, time, threading, logging
+from collections import OrderedDict
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from shared.http_cache import make_etag
+
+logger = logging.getLogger(__name__)
+
+# Seconds the data version is trusted before it is re-read; within this
+# window a poll with a matching ETag is answered without any database work
+DASHBOARD_VERSION_TTL = float(os.getenv("DASHBOARD_VERSION_TTL", "5"))
+# Cached results kept per process (least recently used evicted first)
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "256"))
+
+
+class DashboardCache:
+    """Process-wide cache of dashboard results keyed on endpoint + parameters.
+
+    Results are tagged with a data version: the number of purchases recorded
+    (purchase_counters, written in each checkout's transaction), the latest
+    purchase timestamp, the total number of units sold and the dashboard
+    epoch, which bulk deletes, partition detaches and reloads replace. All
+    are cheap to read (three tiny tables and an index lookup). The version
+    is itself cached for DASHBOARD_VERSION_TTL seconds, so results can be up
+    to that stale.
+    """
+
+    version_ttl = DASHBOARD_VERSION_TTL
+    max_entries = DASHBOARD_CACHE_SIZE
+
+    _version = None
+    _checked_at = 0.0
+    _results = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def version(cls, db: Session):
+        """Current data version, re-read at most once per version_ttl"""
+        if cls._version is not None and time.monotonic() - cls._checked_at < cls.version_ttl:
+            return cls._version
+        row = db.execute(text(
+            'SELECT (SELECT COALESCE(SUM(purchase_count), 0) FROM purchase_counters), '
+            '(SELECT MAX("timestamp") FROM purchases), '
+            '(SELECT COALESCE(SUM(sale_count), 0) FROM product_sale_counts), '
+            '(SELECT MAX(epoch) FROM dashboard_epoch)'
+        )).first()
+        version = f"{row[0]}:{row[1]}:{row[2]}:{row[3]}"
+        with cls._lock:
+            if version != cls._version:
+                logger.info("Dashboard data version changed to %s", version)
+                cls._results.clear()
+            cls._version = version
+            cls._checked_at = time.monotonic()
+        return version
+
+    @staticmethod
+    def key(path: str, params):
+        """Cache key for a path and its (name, value) query parameters"""
+        return f"{path}?{'&'.join(f'{k}={v}' for k, v in sorted(params))}"
+
+    @staticmethod
+    def etag(key: str, version: str):
+        return make_etag(key, version)
+
+    @classmethod
+    def get(cls, key: str, version: str):
+        with cls._lock:
+            entry = cls._results.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            cls._results.move_to_end(key)
+            return entry[1]
+
+    @classmethod
+    def put(cls, key: str, version: str, payload):
+        with cls._lock:
+            cls._results[key] = (version, payload)
+            cls._results.move_to_end(key)
+            while len(cls._results) > cls.max_entries:
+                cls._results.popitem(last=False)
+        return payload
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._version = None
+            cls._checked_at = 0.0
+            cls._results.clear()
@@ -1,51 +1,211 @@
+from datetime import timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from collections import Counter
+from sqlalchemy import text, select, func, distinct, desc, literal, null, union_all
 import logging
+from shared.log_utils import RowProgress
+from shared.models.purchase import Purchase
+from shared.models.purchase_item import PurchaseItem
+from shared.models.dashboard_summary import UserPurchaseCount, ProductSaleCount
 
 logger = logging.getLogger(__name__)
 
+# Dialects where top_products is ranked entirely in SQL
+_RANKING_DIALECTS = {"postgresql"}
+
 class PurchaseService:
+    """Owner dashboard analytics.
+
+    Reads the summary tables the cashier keeps up to date on every sale
+    (user_purchase_counts, product_sale_counts) instead of scanning the
+    purchase history, so latency does not grow with the number of receipts.
+
+    Every method also takes an optional window (`start` inclusive, `end`
+    exclusive, `supermarket_id`). Windowed calls aggregate purchases directly
+    with range predicates on `timestamp`, which the (timestamp) and
+    (supermarket_id, timestamp) indexes serve without a full scan.
+    """
+
+    @staticmethod
+    def _window(start=None, end=None, supermarket_id=None):
+        """WHERE conditions on purchases for the window; [] means all time"""
+        start, end = _as_utc(start), _as_utc(end)
+        if start is not None and end is not None and start >= end:
+            raise ValueError("'from' must be earlier than 'to'")
+        conditions = []
+        if supermarket_id is not None:
+            conditions.append(Purchase.supermarket_id == supermarket_id)
+        if start is not None:
+            conditions.append(Purchase.timestamp >= start)
+        if end is not None:
+            conditions.append(Purchase.timestamp < end)
+        return conditions
 
     @classmethod
-    def unique_buyers(cls, db: Session):
+    def unique_buyers(cls, db: Session, start=None, end=None, supermarket_id=None):
         logger.info("Calculating unique buyers")
-        # count distinct user_id in purchases
-        q = db.execute(text("SELECT COUNT(DISTINCT user_id) FROM purchases"))
+        window = cls._window(start, end, supermarket_id)
+        if window:
+            q = db.execute(select(func.count(distinct(Purchase.user_id))).where(*window))
+        else:
+            # user_purchase_counts holds exactly one row per distinct buyer
+            q = db.execute(text("SELECT COUNT(*) FROM user_purchase_counts"))
         count = q.scalar()
-        logger.info(f"Unique buyers count: {count}")
+        logger.info("Unique buyers count: %s", count)
         return count
 
     @classmethod
-    def loyal_buyers(cls, db: Session, min_purchases: int = 3):
-        logger.info(f"Fetching loyal buyers with min_purchases={min_purchases}")
-        q = db.execute(
-            text("SELECT user_id, COUNT(*) as cnt FROM purchases GROUP BY user_id HAVING COUNT(*) >= :min ORDER BY cnt DESC"),
-            {"min": min_purchases}
-        )
+    def loyal_buyers(cls, db: Session, min_purchases: int = 3, start=None, end=None, supermarket_id=None):
+        logger.info("Fetching loyal buyers with min_purchases=%s", min_purchases)
+        window = cls._window(start, end, supermarket_id)
+        if window:
+            purchases = func.count().label("purchase_count")
+            q = db.execute(
+                select(Purchase.user_id, purchases)
+                .where(*window)
+                .group_by(Purchase.user_id)
+                .having(func.count() >= min_purchases)
+                .order_by(purchases.desc())
+            )
+        else:
+            q = db.execute(
+                text("SELECT user_id, purchase_count FROM user_purchase_counts WHERE purchase_count >= :min ORDER BY purchase_count DESC"),
+                {"min": min_purchases}
+            )
+        progress = RowProgress(logger, "loyal_buyers")
         rows = [ {"user_id": r[0], "purchases": r[1]} for r in q.fetchall() ]
-        logger.info(f"Found {len(rows)} loyal buyers")
+        progress.add(len(rows))
+        progress.done()
+        logger.info("Found %s loyal buyers", len(rows))
         return rows
 
     @classmethod
-    def top_products(cls, db: Session, top_n: int = 3):
-        logger.info(f"Calculating top products with top_n={top_n}")
-        # fetch items_list and count occurrences
-        res = db.execute(text("SELECT items_list FROM purchases"))
-        counts = Counter()
-        for r in res:
-            items = r[0].split(",") if r[0] else []
-            for it in items:
-                item = it.strip()
-                logger.debug(f"Counting product occurrence: {item}")
-                if item:
-                    counts[item] += 1
-        if not counts:
+    def top_products(cls, db: Session, top_n: int = 3, start=None, end=None, supermarket_id=None):
+        """Most sold products; every product tied with the top_n-th is included"""
+        logger.info("Calculating top products with top_n=%s", top_n)
+        window = cls._window(start, end, supermarket_id)
+        if top_n < 1:
             return []
-
-        # get threshold based on top_n (include ties)
-        most_common = counts.most_common()
-        threshold = most_common[ min(top_n-1, len(most_common)-1) ][1]
-        result = [ {"product": k, "count": v} for k,v in most_common if v >= threshold ]
-        logger.info(f"Top products calculated: {result}")
+        counts = cls._product_counts(window)
+        if db.get_bind().dialect.name in _RANKING_DIALECTS:
+            q = db.execute(cls._ranked_products(counts, top_n).order_by(desc("cnt"), "product"))
+            result = [{"product": r[0], "count": int(r[1])} for r in q.fetchall()]
+        else:
+            result = cls._top_products_python(db, counts, top_n)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Top products calculated: %s", result)
+        logger.info("Top products calculated: %s rows", len(result))
         return result
+
+    @classmethod
+    def summary(cls, db: Session, min_purchases: int = 3, top_n: int = 3, start=None, end=None, supermarket_id=None):
+        """unique_buyers, loyal_buyers and top_products in one call.
+
+        Where ranking runs in SQL this is a single statement (CTEs joined with
+        UNION ALL), so all three figures come from one snapshot in one round
+        trip. Elsewhere the three queries share this session's transaction.
+        """
+        logger.info("Calculating dashboard summary")
+        window = {"start": start, "end": end, "supermarket_id": supermarket_id}
+        conditions = cls._window(**window)
+        if db.get_bind().dialect.name not in _RANKING_DIALECTS:
+            return {
+                "unique_buyers": cls.unique_buyers(db, **window),
+                "loyal_buyers": cls.loyal_buyers(db, min_purchases, **window),
+                "top_products": cls.top_products(db, top_n, **window),
+            }
+
+        buyers = cls._buyer_counts(conditions)
+        parts = [
+            select(literal("unique_buyers").label("kind"), null().label("name"), func.count().label("value"))
+            .select_from(buyers),
+            select(literal("loyal_buyers"), buyers.c.user_id, buyers.c.purchase_count)
+            .where(buyers.c.purchase_count >= min_purchases),
+        ]
+        if top_n >= 1:
+            ranked = cls._ranked_products(cls._product_counts(conditions), top_n).subquery("top_ranked")
+            parts.append(select(literal("top_products"), ranked.c.product, ranked.c.cnt))
+
+        unique, loyal, top = 0, [], []
+        for kind, name, value in db.execute(union_all(*parts)):
+            if kind == "unique_buyers":
+                unique = int(value)
+            elif kind == "loyal_buyers":
+                loyal.append({"user_id": name, "purchases": int(value)})
+            else:
+                top.append({"product": name, "count": int(value)})
+        loyal.sort(key=lambda r: -r["purchases"])
+        top.sort(key=lambda r: (-r["count"], r["product"]))
+        logger.info("Dashboard summary: %s buyers, %s loyal, %s top products", unique, len(loyal), len(top))
+        return {"unique_buyers": unique, "loyal_buyers": loyal, "top_products": top}
+
+    @staticmethod
+    def _buyer_counts(window):
+        """(user_id, purchase_count) per buyer, from the summary table unless windowed"""
+        if not window:
+            return select(UserPurchaseCount.user_id, UserPurchaseCount.purchase_count).cte("buyer_counts")
+        return (
+            select(Purchase.user_id, func.count().label("purchase_count"))
+            .where(*window)
+            .group_by(Purchase.user_id)
+            .cte("buyer_counts")
+        )
+
+    @staticmethod
+    def _product_counts(window):
+        """(product, cnt) units sold per product, from the summary table unless windowed"""
+        if not window:
+            return (
+                select(ProductSaleCount.product_name.label("product"), ProductSaleCount.sale_count.label("cnt"))
+                .where(ProductSaleCount.sale_count > 0)
+                .cte("product_counts")
+            )
+        return (
+            select(PurchaseItem.product_name.label("product"),
+                   func.sum(PurchaseItem.quantity).label("cnt"))
+            .join(Purchase, Purchase.id == PurchaseItem.purchase_id)
+            .where(*window)
+            .group_by(PurchaseItem.product_name)
+            .cte("product_counts")
+        )
+
+    @staticmethod
+    def _ranked_products(counts, top_n: int):
+        # RANK() (not DENSE_RANK) matches the original threshold rule: a
+        # product is kept when fewer than top_n products sold strictly more
+        ranked = select(
+            counts.c.product, counts.c.cnt,
+            func.rank().over(order_by=counts.c.cnt.desc()).label("rnk"),
+        ).subquery("ranked")
+        return select(ranked.c.product, ranked.c.cnt).where(ranked.c.rnk <= top_n)
+
+    @classmethod
+    def _top_products_python(cls, db: Session, counts, top_n: int):
+        # Fallback for databases without window functions: apply the tie
+        # threshold here
+        progress = RowProgress(logger, "top_products")
+        q = db.execute(select(counts.c.product, counts.c.cnt))
+        rows = []
+        for r in q:
+            rows.append((r[0], int(r[1])))
+            progress.add()
+        progress.done()
+        return _apply_top_threshold(rows, top_n)
+
+
+def _as_utc(value):
+    """Naive datetimes are taken to be UTC, matching how timestamps are stored"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _apply_top_threshold(counts, top_n: int):
+    counts = sorted(counts, key=lambda kv: (-kv[1], kv[0]))
+    if not counts:
+        return []
+
+    # get threshold based on top_n (include ties)
+    threshold = counts[min(top_n, len(counts)) - 1][1]
+    return [{"product": k, "count": v} for k, v in counts if v >= threshold]
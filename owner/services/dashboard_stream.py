@@ -0,0 +1,217 @@
+import os, json, select, asyncio, threading, logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.engine import make_url
+from owner.db import engine, SessionLocal
+from owner.services.dashboard_service import PurchaseService
+from owner.services.dashboard_cache import DashboardCache
+from shared.notifications import DASHBOARD_CHANNEL
+from shared.settings import DatabaseSettings, settings
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two pushes; changes inside one interval are coalesced
+DASHBOARD_PUSH_INTERVAL = float(os.getenv("DASHBOARD_PUSH_INTERVAL", "2"))
+# Direct PostgreSQL URL for LISTEN when DATABASE_URL points at PgBouncer
+DASHBOARD_LISTEN_URL = os.getenv("DASHBOARD_LISTEN_URL", "")
+
+
+class DashboardStream:
+    """Pushes fresh dashboard summaries to connected stream clients.
+
+    On PostgreSQL a listener thread LISTENs on the channel the cashier
+    notifies after every committed purchase; on other databases, and behind
+    PgBouncer transaction pooling unless DASHBOARD_LISTEN_URL gives a direct
+    connection, the cached data version is polled instead.
+
+    Every push_interval, if anything changed, the summary is recomputed once
+    per distinct set of client parameters and handed to each client's queue,
+    so a burst of sales produces at most one push per interval and no work is
+    done while nothing changes. A relative `days` window starts on a minute
+    boundary; when the clock moves that start, its clients get a fresh
+    summary even without new sales, so old purchases leave the window.
+    """
+
+    push_interval = DASHBOARD_PUSH_INTERVAL
+
+    # key -> (summary parameters, set of client queues)
+    _subscribers = {}
+    # key -> window start last pushed to a relative (`days`) subscriber group
+    _starts = {}
+    _changed = threading.Event()
+    _stop = threading.Event()
+    _thread = None
+    _task = None
+    _last_version = None
+
+    @classmethod
+    def compute(cls, params: dict, now=None):
+        with SessionLocal() as db:
+            return PurchaseService.summary(db, **cls.resolve(params, now))
+
+    @staticmethod
+    def resolve(params: dict, now=None):
+        """Summary arguments for params, turning `days` into a start as of now.
+
+        The start is rounded down to the minute, so a relative window moves
+        (and is pushed again) at most once a minute.
+        """
+        params = dict(params)
+        days = params.pop("days", None)
+        if days is not None:
+            start = (now or datetime.now(timezone.utc)) - timedelta(days=days)
+            params["start"] = start.replace(second=0, microsecond=0)
+        return params
+
+    @classmethod
+    def subscribe(cls, key: str, params: dict, now=None):
+        """Register a client; returns the queue its updates are delivered to"""
+        queue = asyncio.Queue(maxsize=1)
+        if key not in cls._subscribers and params.get("days") is not None:
+            cls._starts[key] = cls.resolve(params, now)["start"]
+        cls._subscribers.setdefault(key, (params, set()))[1].add(queue)
+        logger.info("Dashboard stream client connected (%s)", cls.client_count())
+        return queue
+
+    @classmethod
+    def unsubscribe(cls, key: str, queue):
+        entry = cls._subscribers.get(key)
+        if entry is not None:
+            entry[1].discard(queue)
+            if not entry[1]:
+                del cls._subscribers[key]
+                cls._starts.pop(key, None)
+        logger.info("Dashboard stream client disconnected (%s)", cls.client_count())
+
+    @classmethod
+    def client_count(cls):
+        return sum(len(queues) for _, queues in cls._subscribers.values())
+
+    @classmethod
+    def listen_url(cls):
+        """Where the LISTEN connection goes, or None to poll the data version"""
+        if engine.dialect.name != "postgresql":
+            return None
+        if DASHBOARD_LISTEN_URL:
+            return make_url(DatabaseSettings({"DATABASE_URL": DASHBOARD_LISTEN_URL}).url)
+        if settings.pgbouncer:
+            # Transaction pooling hands the session back after every statement,
+            # so a LISTEN through it would silently never receive anything
+            logger.warning("DB_PGBOUNCER without DASHBOARD_LISTEN_URL: polling the dashboard "
+                           "data version instead of LISTEN")
+            return None
+        return engine.url
+
+    @classmethod
+    def start(cls):
+        cls._stop.clear()
+        url = cls.listen_url()
+        if url is not None:
+            cls._thread = threading.Thread(target=cls._listen, args=(url,), name="dashboard-listener", daemon=True)
+            cls._thread.start()
+        cls._task = asyncio.create_task(cls._broadcast_loop())
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+        if cls._task is not None:
+            cls._task.cancel()
+        cls._thread = cls._task = None
+
+    @classmethod
+    async def _broadcast_loop(cls):
+        while True:
+            await asyncio.sleep(cls.push_interval)
+            try:
+                await cls.broadcast_once()
+            except Exception:
+                logger.exception("Dashboard stream broadcast failed")
+
+    @classmethod
+    async def broadcast_once(cls, now=None):
+        """Push one update to every client whose summary may have changed.
+
+        That is every client when the data changed, otherwise only relative
+        windows whose start moved. Returns the number of pushes made.
+        """
+        changed = await cls._has_changes()
+        now = now or datetime.now(timezone.utc)
+        pushes = 0
+        for key, (params, queues) in list(cls._subscribers.items()):
+            if not queues:
+                continue
+            if params.get("days") is not None:
+                start = cls.resolve(params, now)["start"]
+                if not changed and start == cls._starts.get(key):
+                    continue
+                cls._starts[key] = start
+            elif not changed:
+                continue
+            payload = await asyncio.to_thread(cls.compute, params, now)
+            for queue in list(queues):
+                cls._offer(queue, payload)
+                pushes += 1
+        if pushes:
+            logger.info("Dashboard stream pushed %s updates", pushes)
+        return pushes
+
+    @classmethod
+    async def _has_changes(cls):
+        if cls._thread is not None:
+            if not cls._changed.is_set():
+                return False
+            cls._changed.clear()
+            # Let ETag polls see the new data straight away as well
+            DashboardCache.invalidate()
+            return bool(cls._subscribers)
+        if not cls._subscribers:
+            return False
+        version = await asyncio.to_thread(cls._read_version)
+        changed = cls._last_version is not None and version != cls._last_version
+        cls._last_version = version
+        return changed
+
+    @classmethod
+    def _read_version(cls):
+        with SessionLocal() as db:
+            return DashboardCache.version(db)
+
+    @staticmethod
+    def _offer(queue, payload):
+        # A slow client only ever holds the newest summary
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    @staticmethod
+    def format_event(payload):
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @classmethod
+    def _listen(cls, url):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        connect_args = url.translate_connect_args(username="user", database="dbname")
+        connect_args.update(url.query)
+        while not cls._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**connect_args)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f"LISTEN {DASHBOARD_CHANNEL}")
+                logger.info("Listening for dashboard updates on %s", DASHBOARD_CHANNEL)
+                # Sales may have happened while we were not listening
+                cls._changed.set()
+                while not cls._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        cls._changed.set()
+            except Exception:
+                logger.exception("Dashboard listener failed, reconnecting")
+                cls._stop.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,186 @@
+const API_BASE = window.location.origin;
+const REFRESH_INTERVAL = 30000; // polling fallback when live updates are unavailable
+let refreshInterval;
+let stream;
+
+// Load data when page loads
+window.addEventListener('load', connectStream);
+
+// Live updates over Server-Sent Events: the server sends the summary
+// on connect and again whenever a purchase changes it
+function connectStream() {
+    if (stream) stream.close();
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    stream = new EventSource(`${API_BASE}/dashboard/stream${rangeQuery(true)}`);
+    stream.onopen = stopPolling;
+    stream.onmessage = (event) => renderSummary(JSON.parse(event.data));
+    // EventSource keeps reconnecting on its own; poll until it succeeds
+    stream.onerror = startPolling;
+}
+
+function startPolling() {
+    if (refreshInterval) return;
+    loadAllData();
+    refreshInterval = setInterval(loadAllData, REFRESH_INTERVAL);
+}
+
+function stopPolling() {
+    if (refreshInterval) {
+        clearInterval(refreshInterval);
+        refreshInterval = null;
+    }
+}
+
+// Query string for the selected time range ("" = all time). The stream is
+// long-lived, so it sends the relative window and the server moves its start
+// on every push; polls send a fixed start instead
+function rangeQuery(relative = false) {
+    const days = document.getElementById('rangeSelect').value;
+    if (!days) return '';
+    if (relative) return `?days=${encodeURIComponent(days)}`;
+    // Rounded to the minute so repeated polls share one cache entry / ETag
+    const from = new Date(Date.now() - days * 24 * 60 * 60 * 1000);
+    from.setSeconds(0, 0);
+    return `?from=${encodeURIComponent(from.toISOString())}`;
+}
+
+async function loadAllData() {
+    document.getElementById('refreshBtn').disabled = true;
+
+    try {
+        // One request (and one DB round trip) for all three panels
+        const response = await fetch(`${API_BASE}/dashboard/summary${rangeQuery()}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        renderSummary(await response.json());
+    } catch (error) {
+        console.error('Error loading dashboard summary:', error);
+        showLoadError();
+    } finally {
+        document.getElementById('refreshBtn').disabled = false;
+    }
+}
+
+function renderSummary(data) {
+    renderUniqueBuyers(data.unique_buyers);
+    renderLoyalBuyers(data.loyal_buyers);
+    renderTopProducts(data.top_products);
+}
+
+function showLoadError() {
+    document.getElementById('uniqueBuyersValue').textContent = 'Error';
+    document.getElementById('loyalBuyersContainer').innerHTML = `
+        <div class="empty-state">
+            <p>⚠️ Error loading loyal customers</p>
+        </div>
+    `;
+    document.getElementById('topProductsContainer').innerHTML = `
+        <div class="empty-state">
+            <p>⚠️ Error loading top products</p>
+        </div>
+    `;
+}
+
+function renderUniqueBuyers(count) {
+    document.getElementById('uniqueBuyersValue').textContent = count || 0;
+}
+
+function renderLoyalBuyers(rows) {
+    const container = document.getElementById('loyalBuyersContainer');
+    const loyalBuyers = rows || [];
+
+    if (loyalBuyers.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">📭</div>
+                <p>No loyal customers yet</p>
+            </div>
+        `;
+        document.getElementById('loyalCustomersValue').textContent = '0';
+        return;
+    }
+
+    document.getElementById('loyalCustomersValue').textContent = loyalBuyers.length;
+
+    const tableHTML = `
+        <table>
+            <thead>
+                <tr>
+                    <th>#</th>
+                    <th>Customer ID</th>
+                    <th>Number of Purchases</th>
+                    <th>Status</th>
+                </tr>
+            </thead>
+            <tbody>
+                ${loyalBuyers.map((buyer, index) => `
+                    <tr>
+                        <td>${index + 1}</td>
+                        <td><strong>${buyer.user_id}</strong></td>
+                        <td>${buyer.purchases}</td>
+                        <td>
+                            ${buyer.purchases >= 10 ? 
+                                '<span class="badge badge-success">VIP</span>' : 
+                                '<span class="badge badge-primary">Loyal</span>'}
+                        </td>
+                    </tr>
+                `).join('')}
+            </tbody>
+        </table>
+    `;
+
+    container.innerHTML = tableHTML;
+}
+
+function renderTopProducts(rows) {
+    const container = document.getElementById('topProductsContainer');
+    const products = rows || [];
+
+    if (products.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">📭</div>
+                <p>No purchase data available yet</p>
+            </div>
+        `;
+        document.getElementById('topProductValue').textContent = '-';
+        return;
+    }
+
+    document.getElementById('topProductValue').textContent = products[0].product;
+
+    const maxCount = Math.max(...products.map(p => p.count));
+
+    const tableHTML = `
+        <table>
+            <thead>
+                <tr>
+                    <th>#</th>
+                    <th>Product Name</th>
+                    <th>Times Purchased</th>
+                </tr>
+            </thead>
+            <tbody>
+                ${products.map((product, index) => {
+                    return `
+                        <tr>
+                            <td>${index + 1}</td>
+                            <td><strong>${product.product}</strong></td>
+                            <td>${product.count}</td>
+                        </tr>
+                    `;
+                }).join('')}
+            </tbody>
+        </table>
+    `;
+
+    container.innerHTML = tableHTML;
+}
+
+// Cleanup on page unload
+window.addEventListener('unload', () => {
+    if (stream) stream.close();
+    stopPolling();
+});
@@ -0,0 +1,145 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from shared.models.base import Base
+from shared.models import User, Purchase
+from shared.models.dashboard_summary import ProductSaleCount, UserPurchaseCount, PurchaseCounter
+from shared.http_cache import etag_matches
+from shared.notifications import bump_dashboard_epoch
+from owner.controllers import dashboard_controller
+from owner.services.dashboard_cache import DashboardCache
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    DashboardCache.invalidate()
+    monkeypatch.setattr(DashboardCache, "version_ttl", 60)
+    Session = sessionmaker(bind=engine)
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(dashboard_controller.router)
+    app.dependency_overrides[dashboard_controller.get_db] = get_db
+    yield TestClient(app)
+    DashboardCache.invalidate()
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_matching_etag_returns_304_without_queries(client, engine):
+    first = client.get("/dashboard/summary")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    statements = count_statements(engine)
+    second = client.get("/dashboard/summary", headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert statements == []
+
+
+def test_etag_depends_on_parameters(client):
+    default = client.get("/dashboard/top-products").headers["etag"]
+    top_five = client.get("/dashboard/top-products?top_n=5").headers["etag"]
+    assert default != top_five
+
+
+def test_new_sales_change_the_version(client, engine, monkeypatch):
+    etag = client.get("/dashboard/top-products").headers["etag"]
+    with sessionmaker(bind=engine)() as db:
+        db.add(ProductSaleCount(product_name="milk", sale_count=2))
+        db.commit()
+    monkeypatch.setattr(DashboardCache, "version_ttl", 0)
+
+    response = client.get("/dashboard/top-products", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json() == {"top_products": [{"product": "milk", "count": 2}]}
+
+
+def test_results_are_evicted_least_recently_used_first(monkeypatch):
+    DashboardCache.invalidate()
+    monkeypatch.setattr(DashboardCache, "max_entries", 2)
+    DashboardCache.put("a", "v1", 1)
+    DashboardCache.put("b", "v1", 2)
+    DashboardCache.get("a", "v1")
+    DashboardCache.put("c", "v1", 3)
+
+    assert DashboardCache.get("a", "v1") == 1
+    assert DashboardCache.get("b", "v1") is None
+    assert DashboardCache.get("a", "v2") is None
+    DashboardCache.invalidate()
+
+
+def test_etag_matching():
+    assert etag_matches('"x"', '"x"')
+    assert etag_matches('W/"x", "y"', '"x"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches('"y"', '"x"')
+    assert not etag_matches(None, '"x"')
+
+
+def test_purchase_without_newer_timestamp_or_items_changes_the_version(client, engine, monkeypatch):
+    # A checkout that committed late with an older timestamp and an empty
+    # basket moves neither MAX(timestamp) nor the units sold
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([User(user_id="u1"), Purchase(id="p1", supermarket_id="s1", user_id="u1",
+                                                 timestamp=datetime(2026, 10, 18, 12, tzinfo=timezone.utc))])
+        db.commit()
+    etag = client.get("/dashboard/unique-buyers").headers["etag"]
+    with Session() as db:
+        db.add_all([
+            User(user_id="u2"),
+            Purchase(id="p2", supermarket_id="s1", user_id="u2", timestamp=datetime(2026, 10, 18, 11, tzinfo=timezone.utc)),
+            UserPurchaseCount(user_id="u2", purchase_count=1),
+            PurchaseCounter(slot=3, purchase_count=1),
+        ])
+        db.commit()
+    monkeypatch.setattr(DashboardCache, "version_ttl", 0)
+
+    response = client.get("/dashboard/unique-buyers", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json() == {"unique_buyers": 1}
+
+
+def test_bulk_removal_changes_the_version_through_the_epoch(client, engine, monkeypatch):
+    etag = client.get("/dashboard/unique-buyers").headers["etag"]
+    # e.g. a dropped partition, or a reload that ends on the same totals
+    with engine.begin() as conn:
+        bump_dashboard_epoch(conn)
+    monkeypatch.setattr(DashboardCache, "version_ttl", 0)
+    etag_after = client.get("/dashboard/unique-buyers", headers={"If-None-Match": etag}).headers["etag"]
+
+    with engine.begin() as conn:
+        bump_dashboard_epoch(conn)
+
+    assert etag_after != etag
+    assert client.get("/dashboard/unique-buyers", headers={"If-None-Match": etag_after}).status_code == 200
@@ -0,0 +1,145 @@
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from shared.models.base import Base
+from shared.models.purchase import Purchase
+from shared.models.purchase_item import PurchaseItem
+from shared.models.dashboard_summary import UserPurchaseCount, ProductSaleCount
+from shared.models.user import User
+from owner.services.dashboard_service import PurchaseService
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(params=["python", "ranked"])
+def ranking(request, monkeypatch):
+    if request.param == "ranked":
+        # SQLite supports RANK(), so the Postgres query can be exercised here too
+        monkeypatch.setattr("owner.services.dashboard_service._RANKING_DIALECTS", {"postgresql", "sqlite"})
+    return request.param
+
+
+def add_purchase(db, purchase_id, user_id, items, supermarket_id="s1", timestamp=None):
+    db.merge(User(user_id=user_id))
+    db.add(Purchase(id=purchase_id, supermarket_id=supermarket_id, user_id=user_id,
+                    items_list=",".join(items), total_amount=0, timestamp=timestamp))
+    buyer = db.get(UserPurchaseCount, user_id) or UserPurchaseCount(user_id=user_id, purchase_count=0)
+    buyer.purchase_count += 1
+    db.add(buyer)
+    for name in set(items):
+        db.add(PurchaseItem(purchase_id=purchase_id, product_name=name, quantity=items.count(name), unit_price_at_sale=1.0))
+        product = db.get(ProductSaleCount, name) or ProductSaleCount(product_name=name, sale_count=0)
+        product.sale_count += items.count(name)
+        db.add(product)
+    db.commit()
+
+
+def test_top_products_includes_ties_at_threshold(db_session, ranking):
+    add_purchase(db_session, "p1", "u1", ["milk", "bread", "eggs", "cheese"])
+    add_purchase(db_session, "p2", "u2", ["milk", "bread", "eggs"])
+    add_purchase(db_session, "p3", "u3", ["milk", "bread", "yogurt"])
+
+    result = PurchaseService.top_products(db_session, top_n=3)
+
+    assert result == [
+        {"product": "bread", "count": 3},
+        {"product": "milk", "count": 3},
+        {"product": "eggs", "count": 2},
+    ]
+
+
+def test_top_products_keeps_all_products_tied_with_nth(db_session, ranking):
+    add_purchase(db_session, "p1", "u1", ["milk", "milk", "bread", "eggs", "cheese"])
+
+    result = PurchaseService.top_products(db_session, top_n=2)
+
+    assert result[0] == {"product": "milk", "count": 2}
+    assert {r["product"] for r in result[1:]} == {"bread", "eggs", "cheese"}
+
+
+def test_top_products_empty(db_session, ranking):
+    assert PurchaseService.top_products(db_session) == []
+
+
+def test_unique_and_loyal_buyers_read_summary_counts(db_session):
+    for i in range(3):
+        add_purchase(db_session, f"a{i}", "regular", ["milk"])
+    add_purchase(db_session, "b0", "once", ["bread"])
+
+    assert PurchaseService.unique_buyers(db_session) == 2
+    assert PurchaseService.loyal_buyers(db_session, min_purchases=3) == [{"user_id": "regular", "purchases": 3}]
+
+
+def day(n):
+    return datetime(2024, 1, n, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(db_session):
+    add_purchase(db_session, "old1", "regular", ["milk", "milk"], timestamp=day(1))
+    add_purchase(db_session, "old2", "regular", ["milk"], timestamp=day(2))
+    add_purchase(db_session, "new1", "regular", ["bread"], timestamp=day(10))
+    add_purchase(db_session, "new2", "regular", ["bread", "eggs"], timestamp=day(11))
+    add_purchase(db_session, "new3", "other", ["eggs"], supermarket_id="s2", timestamp=day(12))
+    return db_session
+
+
+def test_windowed_queries_only_count_purchases_in_range(history, ranking):
+    window = {"start": day(10), "end": day(13)}
+
+    assert PurchaseService.unique_buyers(history, **window) == 2
+    assert PurchaseService.loyal_buyers(history, min_purchases=2, **window) == [{"user_id": "regular", "purchases": 2}]
+    assert PurchaseService.top_products(history, top_n=1, **window) == [
+        {"product": "bread", "count": 2},
+        {"product": "eggs", "count": 2},
+    ]
+
+
+def test_window_end_is_exclusive_and_supermarket_filters(history, ranking):
+    assert PurchaseService.unique_buyers(history, start=day(1), end=day(10)) == 1
+    assert PurchaseService.top_products(history, top_n=1, supermarket_id="s2") == [{"product": "eggs", "count": 1}]
+    # all-time answers still come from the summary tables
+    assert PurchaseService.top_products(history, top_n=1) == [{"product": "milk", "count": 3}]
+
+
+def test_naive_window_bounds_are_utc(history):
+    assert PurchaseService.unique_buyers(history, start=datetime(2024, 1, 12)) == 1
+
+
+def test_inverted_window_is_rejected(history):
+    with pytest.raises(ValueError):
+        PurchaseService.unique_buyers(history, start=day(5), end=day(1))
+
+
+@pytest.mark.parametrize("window", [{}, {"start": day(10)}])
+def test_summary_matches_individual_endpoints(history, ranking, window):
+    summary = PurchaseService.summary(history, min_purchases=2, top_n=2, **window)
+
+    assert summary == {
+        "unique_buyers": PurchaseService.unique_buyers(history, **window),
+        "loyal_buyers": PurchaseService.loyal_buyers(history, min_purchases=2, **window),
+        "top_products": PurchaseService.top_products(history, top_n=2, **window),
+    }
+
+
+def test_summary_is_one_statement_when_ranking_in_sql(history, monkeypatch):
+    monkeypatch.setattr("owner.services.dashboard_service._RANKING_DIALECTS", {"postgresql", "sqlite"})
+    statements = []
+    event.listen(history.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    PurchaseService.summary(history)
+
+    assert len(statements) == 1
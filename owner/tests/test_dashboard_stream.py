@@ -0,0 +1,132 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from shared.models.base import Base
+from shared.notifications import notify_dashboard
+from shared.settings import settings
+from owner.services import dashboard_stream
+from owner.services.dashboard_stream import DashboardStream
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    computed = []
+
+    def compute(params, now=None):
+        computed.append(DashboardStream.resolve(params, now))
+        return {"unique_buyers": len(computed)}
+
+    monkeypatch.setattr(DashboardStream, "compute", compute)
+    # Pretend the LISTEN thread is running
+    monkeypatch.setattr(DashboardStream, "_thread", object())
+    monkeypatch.setattr(DashboardStream, "_subscribers", {})
+    monkeypatch.setattr(DashboardStream, "_starts", {})
+    DashboardStream._changed.clear()
+    yield computed
+    DashboardStream._changed.clear()
+
+
+def test_burst_of_notifications_is_pushed_once(stream):
+    async def scenario():
+        queue = DashboardStream.subscribe("k", {"top_n": 3})
+        for _ in range(5):
+            DashboardStream._changed.set()
+        assert await DashboardStream.broadcast_once() == 1
+        assert await DashboardStream.broadcast_once() == 0
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert stream == [{"top_n": 3}]
+    assert queue.get_nowait() == {"unique_buyers": 1}
+
+
+def test_summary_is_computed_once_per_parameter_set(stream):
+    async def scenario():
+        queues = [DashboardStream.subscribe("a", {"top_n": 3}) for _ in range(3)]
+        queues.append(DashboardStream.subscribe("b", {"top_n": 5}))
+        DashboardStream._changed.set()
+        return queues, await DashboardStream.broadcast_once()
+
+    queues, pushes = asyncio.run(scenario())
+    assert pushes == 4
+    assert len(stream) == 2
+
+
+def test_relative_window_moves_without_new_sales(stream):
+    now = datetime(2026, 10, 19, 9, 0, 10, tzinfo=timezone.utc)
+
+    async def scenario():
+        fixed = DashboardStream.subscribe("all", {"top_n": 3})
+        relative = DashboardStream.subscribe("day", {"top_n": 3, "days": 1}, now=now)
+        # Same minute: nothing to push
+        assert await DashboardStream.broadcast_once(now=now + timedelta(seconds=30)) == 0
+        # The minute-rounded start moved, no purchase arrived
+        assert await DashboardStream.broadcast_once(now=now + timedelta(seconds=60)) == 1
+        return fixed, relative
+
+    fixed, relative = asyncio.run(scenario())
+    assert fixed.empty()
+    assert relative.get_nowait() == {"unique_buyers": 1}
+    assert stream == [{"top_n": 3, "start": datetime(2026, 10, 18, 9, 1, tzinfo=timezone.utc)}]
+
+
+def test_slow_client_only_keeps_latest_update(stream):
+    async def scenario():
+        queue = DashboardStream.subscribe("k", {})
+        for _ in range(3):
+            DashboardStream._changed.set()
+            await DashboardStream.broadcast_once()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.qsize() == 1
+    assert queue.get_nowait() == {"unique_buyers": 3}
+
+
+def test_unsubscribe_removes_empty_groups(stream):
+    async def scenario():
+        queue = DashboardStream.subscribe("k", {})
+        DashboardStream.unsubscribe("k", queue)
+
+    asyncio.run(scenario())
+    assert DashboardStream.client_count() == 0
+    assert DashboardStream._subscribers == {}
+
+
+def test_format_event_is_a_single_sse_message():
+    assert DashboardStream.format_event({"a": 1}) == f"data: {json.dumps({'a': 1})}\n\n"
+
+
+def test_notify_is_a_no_op_outside_postgres():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        notify_dashboard(db, "1")
+
+
+def test_relative_window_is_resolved_on_every_push():
+    params = {"top_n": 3, "days": 1, "end": None}
+    monday = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+    assert DashboardStream.resolve(params, now=monday) == {"top_n": 3, "start": monday - timedelta(days=1), "end": None}
+    assert DashboardStream.resolve(params, now=monday + timedelta(hours=5))["start"] == monday + timedelta(hours=-19)
+    assert params["days"] == 1
+    assert DashboardStream.resolve({"top_n": 3, "days": None}) == {"top_n": 3}
+
+
+def test_pgbouncer_polls_unless_a_direct_listen_url_is_given(monkeypatch):
+    url = make_url("postgresql+psycopg2://app@pgbouncer:6432/icash")
+    monkeypatch.setattr(dashboard_stream, "engine", SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), url=url))
+    assert DashboardStream.listen_url() == url
+
+    monkeypatch.setattr(settings, "pgbouncer", True)
+    assert DashboardStream.listen_url() is None
+
+    monkeypatch.setattr(dashboard_stream, "DASHBOARD_LISTEN_URL", "postgres://app@db:5432/icash")
+    assert DashboardStream.listen_url().host == "db"
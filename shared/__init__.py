@@ -0,0 +1 @@
+# shared package
@@ -0,0 +1,95 @@
+"""
+Small helpers for conditional HTTP responses (ETag / If-None-Match) and
+pre-compressed response bodies.
+"""
+import gzip
+import hashlib
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def make_etag(*parts):
+    """Strong ETag derived from the given values"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value covers etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag, headers=None):
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
+
+
+def accepted_encodings(accept_encoding):
+    """Content codings the client accepts (q > 0), from an Accept-Encoding header"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedBody:
+    """A response body serialized and compressed once, served many times.
+
+    Every encoding gets its own strong ETag derived from the content, so
+    the tags are identical across processes and restarts.
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        self.etag = make_etag(hashlib.sha1(body).hexdigest())
+        self.variants = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body)
+        for encoding, data in compressed.items():
+            # Tiny bodies can grow when compressed
+            if len(data) < len(body):
+                self.variants[encoding] = data
+
+    def negotiate(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                return encoding
+        return "identity"
+
+    def variant_etag(self, encoding):
+        if encoding == "identity":
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def response(self, request: Request, cache_control: str):
+        encoding = self.negotiate(request.headers.get("accept-encoding"))
+        etag = self.variant_etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag, headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
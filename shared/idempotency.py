@@ -0,0 +1,59 @@
+"""
+Retention of client idempotency keys (see shared.models.idempotency_key).
+
+A key only has to outlive the retries of its sale, so keys older than
+IDEMPOTENCY_KEY_RETENTION_DAYS are deleted: by data/init_db.py, and
+periodically by the cashier service.
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete
+from shared.settings import env_int
+from shared.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Days a key keeps answering retries; a later retry is recorded as a new sale
+IDEMPOTENCY_KEY_RETENTION_DAYS = env_int(os.environ, "IDEMPOTENCY_KEY_RETENTION_DAYS", 7)
+# Seconds between purges in the cashier service
+IDEMPOTENCY_PURGE_INTERVAL = env_int(os.environ, "IDEMPOTENCY_PURGE_INTERVAL", 3600)
+
+
+def request_hash(supermarket_id: str, user_id: str = None, items: list[str] = None):
+    """Fingerprint of a purchase request, stored with its key.
+
+    A retry must send the same store, customer and basket; the order of the
+    items does not matter.
+    """
+    body = json.dumps([supermarket_id, user_id, sorted(items or [])], separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def purge_idempotency_keys(conn, retention_days: int = IDEMPOTENCY_KEY_RETENTION_DAYS, now: datetime = None):
+    """Delete keys created more than retention_days ago; returns how many"""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    deleted = conn.execute(
+        delete(IdempotencyKey.__table__).where(IdempotencyKey.created_at < cutoff)
+    ).rowcount
+    if deleted:
+        logger.info("Purged %s idempotency keys older than %s days", deleted, retention_days)
+    return deleted
+
+
+def _purge(engine):
+    with engine.begin() as conn:
+        purge_idempotency_keys(conn)
+
+
+async def idempotency_key_purge(engine, interval: int = IDEMPOTENCY_PURGE_INTERVAL):
+    """Background task deleting expired idempotency keys in long-running services"""
+    while True:
+        try:
+            await asyncio.to_thread(_purge, engine)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
+        await asyncio.sleep(interval)
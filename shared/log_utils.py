@@ -0,0 +1,40 @@
+import os
+import time
+import logging
+
+# Emit a progress line every N rows in long loops
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100000"))
+
+
+class RowProgress:
+    """Count rows processed by a loop and log a sampled summary.
+
+    Nothing is formatted per row: a progress line is logged every `every`
+    rows (only if `level` is enabled) and `done()` logs a single
+    "processed N rows in T ms" summary.
+    """
+
+    def __init__(self, logger: logging.Logger, label: str, every: int = LOG_SAMPLE_EVERY, level: int = logging.DEBUG):
+        self.logger = logger
+        self.label = label
+        self.every = max(every, 1)
+        self.level = level
+        self.rows = 0
+        self._next = self.every
+        self._start = time.perf_counter()
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def add(self, n: int = 1):
+        self.rows += n
+        if self.rows >= self._next:
+            self._next = (self.rows // self.every + 1) * self.every
+            if self.logger.isEnabledFor(self.level):
+                self.logger.log(self.level, "%s: processed %d rows so far (%.1f ms)", self.label, self.rows, self.elapsed_ms)
+
+    def done(self, level: int = logging.INFO):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, "%s: processed %d rows in %.1f ms", self.label, self.rows, self.elapsed_ms)
+        return self.rows
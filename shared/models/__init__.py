@@ -0,0 +1,9 @@
+# models package shared by the cashier and owner services
+from .base import Base
+from .user import User
+from .product import Product
+from .purchase import Purchase
+from .purchase_item import PurchaseItem
+from .dashboard_summary import UserPurchaseCount, ProductSaleCount, PurchaseCounter, DashboardEpoch
+from .idempotency_key import IdempotencyKey
+from .data_backfill import DataBackfill
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey
+from .base import Base
+
+class UserPurchaseCount(Base):
+    """Running number of purchases per buyer; one row per distinct buyer"""
+    __tablename__ = "user_purchase_counts"
+
+    user_id = Column(String, ForeignKey("users.user_id"), primary_key=True)
+    purchase_count = Column(Integer, nullable=False, default=0, index=True)
+
+    def __repr__(self):
+        return f"<UserPurchaseCount user={self.user_id} purchases={self.purchase_count}>"
+
+
+class ProductSaleCount(Base):
+    """Running number of units sold per product"""
+    __tablename__ = "product_sale_counts"
+
+    product_name = Column(String, primary_key=True)
+    sale_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ProductSaleCount product={self.product_name} sold={self.sale_count}>"
+
+
+class PurchaseCounter(Base):
+    """Running number of purchases, spread over a few slots.
+
+    Every checkout adds to one random slot in its own transaction, and the
+    owner's cache version reads SUM(purchase_count). The total changes with
+    every committed purchase, whatever its timestamp or basket. Using several
+    slots keeps concurrent checkouts from queueing on a single row lock.
+    """
+    __tablename__ = "purchase_counters"
+
+    SLOTS = 16
+
+    slot = Column(Integer, primary_key=True)
+    purchase_count = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PurchaseCounter slot={self.slot} purchases={self.purchase_count}>"
+
+
+class DashboardEpoch(Base):
+    """A token replaced whenever purchases are removed or reloaded in bulk.
+
+    Deleting purchases, detaching partitions or reloading the seed data can
+    leave the purchase counters and MAX(timestamp) where they were, so the
+    owner's cache version also includes this token. It is random rather
+    than a counter, so a reset database never repeats an earlier value.
+    """
+    __tablename__ = "dashboard_epoch"
+
+    id = Column(Integer, primary_key=True)
+    epoch = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"<DashboardEpoch {self.epoch}>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, func
+from .base import Base
+
+class DataBackfill(Base):
+    """A one-off data backfill that has been completed.
+
+    data/init_db.py writes the row in the same transaction as the backfill,
+    so startup checks this marker instead of guessing from table contents.
+    """
+    __tablename__ = "data_backfills"
+
+    # purchase_items: line items derived from purchases.items_list
+    PURCHASE_ITEMS = "purchase_items"
+
+    name = Column(String, primary_key=True)
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DataBackfill {self.name} at {self.completed_at}>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Float, Boolean, DateTime, func
+from .base import Base
+
+class IdempotencyKey(Base):
+    """Result of a purchase submitted with a client-supplied key.
+
+    Kept apart from purchases so the key can be unique on its own: a unique
+    constraint on the partitioned purchases table would have to include the
+    timestamp. A retry with the same key and request is answered from this
+    row until shared.idempotency purges it after the retention period.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    purchase_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False)
+    is_new = Column(Boolean, nullable=False)
+    total_amount = Column(Float, nullable=False)
+    # Indexed for the retention purge (DELETE ... WHERE created_at < cutoff)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # shared.idempotency.request_hash of the request; a retry must match it
+    request_hash = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey key={self.key} purchase={self.purchase_id}>"
@@ -1,19 +1,22 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 from .base import Base
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        # per-store dashboards filter on supermarket_id within a time window
+        Index("ix_purchases_supermarket_id_timestamp", "supermarket_id", "timestamp"),
+    )
 
     id = Column(String, primary_key=True)
     supermarket_id = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    user_id = Column(String, ForeignKey("users.user_id"))
+    timestamp = Column(DateTime(timezone=True), index=True, server_default=func.now())
+    user_id = Column(String, ForeignKey("users.user_id"), index=True)
     items_list = Column(String)
     total_amount = Column(Float)
 
     user = relationship("User")
 
     def __repr__(self):
-        return f"<Purchase id={self.id} user={self.user_id} total={self.total_amount}>"
+        return f"<Purchase id={self.id} user={self.user_id} total={self.total_amount}>"
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Float, Integer, ForeignKey
+from .base import Base
+
+class PurchaseItem(Base):
+    """One line of a purchase: a product and how many units were sold"""
+    __tablename__ = "purchase_items"
+
+    purchase_id = Column(String, ForeignKey("purchases.id", ondelete="CASCADE"), primary_key=True)
+    product_name = Column(String, primary_key=True, index=True)
+    quantity = Column(Integer, nullable=False)
+    unit_price_at_sale = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<PurchaseItem purchase={self.purchase_id} product={self.product_name} qty={self.quantity}>"
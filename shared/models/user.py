@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, DateTime, Index, func, text
+from .base import Base
+
+class User(Base):
+    __tablename__ = "users"
+    __table_args__ = (
+        # Customer search compares and orders user_id under COLLATE "C" on
+        # PostgreSQL, so this one index serves the prefix match, the keyset
+        # condition and the ordering as a single range scan. The primary key
+        # index cannot under a non-C default collation. SQLite already
+        # compares bytewise and has no "C" collation.
+        Index("ix_users_user_id_c", text('user_id COLLATE "C"')).ddl_if(dialect="postgresql"),
+    )
+
+    user_id = Column(String, primary_key=True)
+    name = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<User id={self.user_id}>"
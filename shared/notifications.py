@@ -0,0 +1,35 @@
+"""
+PostgreSQL LISTEN/NOTIFY channel the cashier uses to tell the owner service
+that dashboard figures changed, and the epoch bumped by bulk changes that
+the owner's cache version would not otherwise notice.
+"""
+import uuid
+from sqlalchemy import insert, text, update
+from shared.models.dashboard_summary import DashboardEpoch
+
+DASHBOARD_CHANNEL = "dashboard_updates"
+
+
+def notify_dashboard(db, payload: str = ""):
+    """Queue a notification inside the caller's transaction.
+
+    PostgreSQL delivers it to listeners only when the transaction commits,
+    and drops it on rollback. A no-op on other databases.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": DASHBOARD_CHANNEL, "payload": payload})
+
+
+def bump_dashboard_epoch(conn):
+    """Invalidate every owner's cached dashboard results from inside conn's transaction.
+
+    For changes that remove or replace purchases (deletes, detached
+    partitions, a reload) rather than add them.
+    """
+    epoch = uuid.uuid4().hex
+    table = DashboardEpoch.__table__
+    if not conn.execute(update(table).where(table.c.id == 1).values(epoch=epoch)).rowcount:
+        conn.execute(insert(table).values(id=1, epoch=epoch))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": DASHBOARD_CHANNEL, "payload": "epoch"})
@@ -0,0 +1,230 @@
+"""
+Optional monthly range partitioning of `purchases` on `timestamp` (PostgreSQL).
+
+Partitions are named purchases_pYYYY_MM and cover [first of month, first of
+next month) in UTC. A DEFAULT partition catches rows outside every range so
+inserts never fail, but partitions should be created ahead of time (see
+`ensure_partitions`) so it stays empty.
+
+Converting changes two constraints, because PostgreSQL requires the
+partition key in every unique constraint of a partitioned table:
+  - the primary key becomes (id, timestamp)
+  - the purchase_items.purchase_id foreign key to purchases is dropped
+"""
+import os
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from shared.settings import env_bool, env_int
+from shared.notifications import bump_dashboard_epoch
+
+logger = logging.getLogger(__name__)
+
+# Convert purchases to a partitioned table on startup (see data/init_db.py)
+PURCHASES_PARTITIONED = env_bool(os.environ, "PURCHASES_PARTITIONED", False)
+# Create partitions this many months past the current one
+PARTITION_MONTHS_AHEAD = env_int(os.environ, "PURCHASES_PARTITION_MONTHS_AHEAD", 3)
+# Seconds between background partition checks in the cashier service
+PARTITION_CHECK_INTERVAL = env_int(os.environ, "PURCHASES_PARTITION_CHECK_INTERVAL", 6 * 3600)
+
+TABLE = "purchases"
+DEFAULT_PARTITION = f"{TABLE}_default"
+# Named explicitly: while the old table still holds purchases_pkey, PostgreSQL
+# would otherwise call the new one purchases_pkey1 for good
+PRIMARY_KEY = f"{TABLE}_pkey"
+
+INDEXES = [
+    ("ix_purchases_user_id", "(user_id)"),
+    ("ix_purchases_timestamp", '("timestamp")'),
+    ("ix_purchases_supermarket_id_timestamp", '(supermarket_id, "timestamp")'),
+]
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def partition_month(name: str):
+    """Inverse of partition_name; None for names that are not monthly partitions"""
+    prefix = f"{TABLE}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y_%m").date()
+    except ValueError:
+        return None
+
+
+def partition_bounds(month: date):
+    """The [from, to) timestamps of a month's partition, as SQL literals"""
+    return f"'{month:%Y-%m-%d} 00:00:00+00'", f"'{add_months(month, 1):%Y-%m-%d} 00:00:00+00'"
+
+
+def partition_ddl(month: date):
+    start, end = partition_bounds(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ({start}) TO ({end})"
+    )
+
+
+def is_partitioned(conn):
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+    ), {"table": TABLE}).scalar()
+
+
+def list_partitions(conn):
+    """Names of the partitions currently attached to purchases"""
+    return list(conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": TABLE}).scalars())
+
+
+def ensure_partitions(conn, months_ahead: int = PARTITION_MONTHS_AHEAD, today=None):
+    """Create monthly partitions from the current month up to months_ahead.
+
+    PostgreSQL refuses to create a partition while the DEFAULT partition
+    holds rows in its range, so any such rows are moved into the new one.
+    """
+    current = month_start(today or datetime.now(timezone.utc))
+    existing = set(list_partitions(conn))
+    created = []
+    for n in range(months_ahead + 1):
+        month = add_months(current, n)
+        if partition_name(month) not in existing:
+            if DEFAULT_PARTITION in existing:
+                _create_from_default(conn, month)
+            else:
+                conn.execute(text(partition_ddl(month)))
+            created.append(partition_name(month))
+    if created:
+        logger.info("Created purchases partitions: %s", ", ".join(created))
+    return created
+
+
+def _create_from_default(conn, month: date):
+    """Create a month's partition, moving its rows out of the DEFAULT partition first"""
+    start, end = partition_bounds(month)
+    in_range = f'"timestamp" >= {start} AND "timestamp" < {end}'
+    if not conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})")).scalar():
+        conn.execute(text(partition_ddl(month)))
+        return
+    staging = f"{partition_name(month)}_staging"
+    conn.execute(text(f"CREATE TEMPORARY TABLE {staging} (LIKE {TABLE}) ON COMMIT DROP"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {staging} SELECT * FROM moved"
+    )).rowcount
+    conn.execute(text(partition_ddl(month)))
+    conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {staging}"))
+    conn.execute(text(f"DROP TABLE {staging}"))
+    logger.warning("Moved %s purchases from %s into %s", moved, DEFAULT_PARTITION, partition_name(month))
+
+
+def convert_to_partitioned(conn, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Rebuild purchases as a partitioned table, copying every existing row.
+
+    Runs inside the caller's transaction; purchases is locked for the copy.
+    """
+    if is_partitioned(conn):
+        logger.info("purchases is already partitioned")
+        return False
+
+    bounds = conn.execute(text(f'SELECT MIN("timestamp"), MAX("timestamp") FROM {TABLE}')).first()
+    conn.execute(text("ALTER TABLE purchase_items DROP CONSTRAINT IF EXISTS purchase_items_purchase_id_fkey"))
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned"))
+    old_key = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'p'"
+    ), {"table": f"{TABLE}_unpartitioned"}).scalar()
+    if old_key is not None:
+        conn.execute(text(f"ALTER TABLE {TABLE}_unpartitioned RENAME CONSTRAINT {old_key} TO {TABLE}_unpartitioned_pkey"))
+    for name, _ in INDEXES:
+        conn.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned"))
+    conn.execute(text(
+        f"CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned INCLUDING DEFAULTS) "
+        f'PARTITION BY RANGE ("timestamp")'
+    ))
+    conn.execute(text(f'UPDATE {TABLE}_unpartitioned SET "timestamp" = now() WHERE "timestamp" IS NULL'))
+    conn.execute(text(f'ALTER TABLE {TABLE} ALTER COLUMN "timestamp" SET NOT NULL'))
+    conn.execute(text(f'ALTER TABLE {TABLE} ADD CONSTRAINT {PRIMARY_KEY} PRIMARY KEY (id, "timestamp")'))
+    conn.execute(text(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT purchases_user_id_fkey "
+        f"FOREIGN KEY (user_id) REFERENCES users (user_id)"
+    ))
+    for name, columns in INDEXES:
+        conn.execute(text(f"CREATE INDEX {name} ON {TABLE} {columns}"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+    today = month_start(datetime.now(timezone.utc))
+    first = month_start(bounds[0]) if bounds[0] else today
+    last = max(month_start(bounds[1]) if bounds[1] else today, today)
+    month = first
+    while month <= last:
+        conn.execute(text(partition_ddl(month)))
+        month = add_months(month, 1)
+    ensure_partitions(conn, months_ahead)
+
+    conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned"))
+    conn.execute(text(f"DROP TABLE {TABLE}_unpartitioned"))
+    conn.execute(text(f"ANALYZE {TABLE}"))
+    logger.info("purchases converted to monthly partitions")
+    return True
+
+
+def detach_partitions(conn, older_than_months: int, drop: bool = False, today=None):
+    """Detach (and optionally drop) monthly partitions older than the cutoff.
+
+    Detached tables keep their rows and can be archived or re-attached. When
+    dropping, the matching purchase_items rows are deleted first. Dashboard
+    summary counters are all-time totals and are not decremented; the
+    dashboard epoch is bumped so owners drop their cached results.
+    """
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc)), -older_than_months)
+    detached = []
+    for name in list_partitions(conn):
+        month = partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DELETE FROM purchase_items WHERE purchase_id IN (SELECT id FROM {name})"))
+            conn.execute(text(f"DROP TABLE {name}"))
+        detached.append(name)
+    if detached:
+        bump_dashboard_epoch(conn)
+        logger.info("%s purchases partitions: %s", "Dropped" if drop else "Detached", ", ".join(detached))
+    return detached
+
+
+def _ensure_if_partitioned(engine):
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            ensure_partitions(conn)
+
+
+async def partition_maintenance(engine, interval: int = PARTITION_CHECK_INTERVAL):
+    """Background task keeping upcoming partitions created in long-running services"""
+    while True:
+        try:
+            await asyncio.to_thread(_ensure_if_partitioned, engine)
+        except Exception:
+            logger.exception("Purchases partition maintenance failed")
+        await asyncio.sleep(interval)
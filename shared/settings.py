@@ -0,0 +1,139 @@
+"""
+Database/engine settings shared by the cashier and owner services.
+
+Everything is read from the environment (and an optional .env file) so pool
+sizing can be tuned per replica without code changes:
+
+    DATABASE_URL             postgres://... or postgresql://... (docker-compose passes this)
+    DB_ASYNC                 serve routes from async controllers on an asyncpg engine
+    DB_POOL_SIZE             persistent connections per process (default 5)
+    DB_MAX_OVERFLOW          extra connections allowed under burst (default 10)
+    DB_POOL_TIMEOUT          seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE          recycle connections older than N seconds (default 1800)
+    DB_POOL_PRE_PING         test connections on checkout (default true)
+    DB_STATEMENT_TIMEOUT_MS  server-side statement_timeout, 0 disables (default 0)
+    DB_PGBOUNCER             PgBouncer transaction pooling: NullPool, no prepared statements
+    DB_ECHO                  log all SQL (default false)
+"""
+import os
+import logging
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = "postgresql://postgres:postgres@db:5432/supermarket"
+
+
+def env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+class DatabaseSettings:
+
+    def __init__(self, environ=None):
+        environ = os.environ if environ is None else environ
+        self.raw_url = environ.get("DATABASE_URL") or DEFAULT_DATABASE_URL
+        self.use_async = env_bool(environ, "DB_ASYNC", False)
+        self.pool_size = env_int(environ, "DB_POOL_SIZE", 5)
+        self.max_overflow = env_int(environ, "DB_MAX_OVERFLOW", 10)
+        self.pool_timeout = env_int(environ, "DB_POOL_TIMEOUT", 30)
+        self.pool_recycle = env_int(environ, "DB_POOL_RECYCLE", 1800)
+        self.pool_pre_ping = env_bool(environ, "DB_POOL_PRE_PING", True)
+        self.statement_timeout_ms = env_int(environ, "DB_STATEMENT_TIMEOUT_MS", 0)
+        self.pgbouncer = env_bool(environ, "DB_PGBOUNCER", False)
+        self.echo = env_bool(environ, "DB_ECHO", False)
+
+    @property
+    def url(self):
+        """Sync SQLAlchemy URL with an explicit driver"""
+        return self._with_driver(psycopg="psycopg2", sqlite="pysqlite")
+
+    @property
+    def async_url(self):
+        """Async SQLAlchemy URL for the same database"""
+        return self._with_driver(psycopg="asyncpg", sqlite="aiosqlite")
+
+    @property
+    def is_postgres(self):
+        return make_url(self.url).get_backend_name() == "postgresql"
+
+    def _with_driver(self, psycopg, sqlite):
+        scheme, sep, rest = self.raw_url.partition("://")
+        backend = scheme.split("+", 1)[0]
+        # docker-compose and most PaaS hand out postgres://, which SQLAlchemy rejects
+        if backend in ("postgres", "postgresql"):
+            return f"postgresql+{psycopg}{sep}{rest}"
+        if backend == "sqlite":
+            return f"sqlite+{sqlite}{sep}{rest}"
+        return self.raw_url
+
+    def engine_kwargs(self, is_async: bool = False, maintenance: bool = False):
+        """Keyword arguments for create_engine / create_async_engine.
+
+        maintenance=True is for init_db, migrations and partition upkeep:
+        no pool, and statement_timeout switched off so long backfills and
+        index builds are not cancelled by the request-serving limit.
+        """
+        kwargs = {"echo": self.echo}
+        if not self.is_postgres:
+            return kwargs
+
+        if maintenance:
+            kwargs["poolclass"] = NullPool
+            if self.pgbouncer:
+                logger.warning("Maintenance connections go through PgBouncer; a statement_timeout "
+                               "set on the database role still applies to them")
+            else:
+                # Also overrides a timeout configured on the role
+                kwargs["connect_args"] = {"options": "-c statement_timeout=0"}
+            return kwargs
+
+        if self.pgbouncer:
+            # PgBouncer owns pooling; keeping our own pool would pin server connections
+            kwargs["poolclass"] = NullPool
+        else:
+            kwargs.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+                pool_pre_ping=self.pool_pre_ping,
+            )
+
+        connect_args = {}
+        if self.statement_timeout_ms:
+            if self.pgbouncer:
+                # PgBouncer rejects startup parameters such as "options"
+                logger.warning("DB_STATEMENT_TIMEOUT_MS is ignored with DB_PGBOUNCER; "
+                               "set it on the database role instead")
+            elif is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(self.statement_timeout_ms)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={self.statement_timeout_ms}"
+        if is_async and self.pgbouncer:
+            # Transaction pooling cannot keep prepared statements across transactions
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+        if connect_args:
+            kwargs["connect_args"] = connect_args
+        return kwargs
+
+
+settings = DatabaseSettings()
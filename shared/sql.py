@@ -0,0 +1,39 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+
+logger = logging.getLogger(__name__)
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING / DO UPDATE ... RETURNING
+CONFLICT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def conflict_insert(bind):
+    """Return the dialect-specific `insert` with ON CONFLICT support for this
+    engine/connection, or None when the database has no such clause"""
+    return CONFLICT_INSERTS.get(bind.dialect.name)
+
+
+def drop_invalid_index(conn, name: str):
+    """Drop index `name` if a failed or cancelled CREATE INDEX CONCURRENTLY
+    left it INVALID (PostgreSQL only).
+
+    An invalid index is never used for reads but is still maintained on every
+    write, and `IF NOT EXISTS` would skip rebuilding it. Must run outside a
+    transaction (e.g. in Alembic's autocommit_block).
+    Returns True if an index was dropped.
+    """
+    if conn.dialect.name != "postgresql":
+        return False
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid AND pg_table_is_visible(c.oid)"
+    ), {"name": name}).first()
+    if invalid is None:
+        return False
+    logger.warning("Dropping invalid index %s left by an interrupted build", name)
+    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+    return True
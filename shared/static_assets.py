@@ -0,0 +1,62 @@
+"""
+UI assets served from memory: content-hashed file names, pre-compressed
+variants and ETags.
+
+At startup every file in a static directory is read once and compressed.
+Assets are published under a name carrying their content hash (app.3f2a91c0.js)
+with a one-year immutable Cache-Control, and references to /static/<name> in
+index.html are rewritten to the hashed names. index.html itself is served with
+`no-cache`, so a reload costs one 304 while the assets come from the browser
+cache.
+"""
+import os
+import hashlib
+import mimetypes
+from fastapi import Request, Response
+from starlette.applications import Starlette
+from starlette.routing import Route
+from shared.http_cache import PrecompressedBody
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class StaticAssets:
+
+    def __init__(self, directory: str, prefix: str = "/static", index: str = "index.html"):
+        self.prefix = prefix
+        # name -> (body, Cache-Control); both the hashed and the plain name resolve
+        self.files = {}
+        self.hashed_names = {}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name == index or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            body = PrecompressedBody(content, media_type=media_type)
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha1(content).hexdigest()[:8]}{ext}"
+            self.hashed_names[name] = hashed
+            self.files[hashed] = (body, IMMUTABLE)
+            self.files[name] = (body, REVALIDATE)
+
+        with open(os.path.join(directory, index), encoding="utf-8") as f:
+            html = f.read()
+        for name, hashed in self.hashed_names.items():
+            html = html.replace(f"{prefix}/{name}", f"{prefix}/{hashed}")
+        self.index = PrecompressedBody(html.encode(), media_type="text/html; charset=utf-8")
+
+        # Mounted at `prefix`; kept out of the OpenAPI schema
+        self.app = Starlette(routes=[Route("/{name:path}", self.serve, methods=["GET", "HEAD"])])
+
+    async def serve(self, request: Request):
+        entry = self.files.get(request.path_params["name"])
+        if entry is None:
+            return Response(status_code=404)
+        body, cache_control = entry
+        return body.response(request, cache_control)
+
+    def index_response(self, request: Request):
+        return self.index.response(request, REVALIDATE)
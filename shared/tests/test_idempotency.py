@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select
+
+from shared.models import Base, IdempotencyKey
+from shared.idempotency import purge_idempotency_keys
+
+
+def test_purge_deletes_only_expired_keys():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+    row = {"purchase_id": "p", "user_id": "u", "is_new": False, "total_amount": 1.0}
+    with engine.begin() as conn:
+        conn.execute(IdempotencyKey.__table__.insert(), [
+            {**row, "key": "old", "created_at": now - timedelta(days=8)},
+            {**row, "key": "recent", "created_at": now - timedelta(days=6)},
+        ])
+        assert purge_idempotency_keys(conn, retention_days=7, now=now) == 1
+        assert conn.execute(select(IdempotencyKey.key)).scalars().all() == ["recent"]
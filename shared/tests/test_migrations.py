@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+
+# shared.models imports every model, so Base.metadata holds all tables
+from shared.models import Base
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "alembic.ini")
+
+
+# ix_users_user_id_c is PostgreSQL-only and an expression index SQLite cannot reflect
+@pytest.mark.filterwarnings("ignore:autogenerate skipping metadata-specified expression-based index")
+def test_migrations_produce_the_model_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
@@ -0,0 +1,67 @@
+from datetime import date
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+
+from shared import partitioning
+from shared.partitioning import (
+    add_months, partition_name, partition_month, partition_ddl, is_partitioned, ensure_partitions,
+)
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert add_months(date(2024, 5, 1), 0) == date(2024, 5, 1)
+
+
+def test_partition_name_round_trips():
+    assert partition_name(date(2024, 3, 1)) == "purchases_p2024_03"
+    assert partition_month("purchases_p2024_03") == date(2024, 3, 1)
+    assert partition_month("purchases_default") is None
+
+
+def test_partition_ddl_covers_one_utc_month():
+    ddl = partition_ddl(date(2024, 12, 1))
+    assert "PARTITION OF purchases" in ddl
+    assert "FROM ('2024-12-01 00:00:00+00') TO ('2025-01-01 00:00:00+00')" in ddl
+
+
+def test_sqlite_is_never_partitioned():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.connect() as conn:
+        assert is_partitioned(conn) is False
+
+
+class RecordingConnection:
+    """Stands in for a PostgreSQL connection: records SQL, answers EXISTS with default_has_rows"""
+
+    def __init__(self, default_has_rows):
+        self.default_has_rows = default_has_rows
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        return SimpleNamespace(scalar=lambda: self.default_has_rows, rowcount=2)
+
+
+def test_new_partition_takes_its_rows_out_of_the_default_partition(monkeypatch):
+    monkeypatch.setattr(partitioning, "list_partitions", lambda conn: ["purchases_default", "purchases_p2026_10"])
+    conn = RecordingConnection(default_has_rows=True)
+
+    assert ensure_partitions(conn, months_ahead=1, today=date(2026, 10, 18)) == ["purchases_p2026_11"]
+
+    moved = next(i for i, sql in enumerate(conn.statements) if sql.startswith("WITH moved AS (DELETE FROM purchases_default"))
+    created = conn.statements.index(partition_ddl(date(2026, 11, 1)))
+    refilled = conn.statements.index("INSERT INTO purchases SELECT * FROM purchases_p2026_11_staging")
+    assert moved < created < refilled
+
+
+def test_new_partition_is_created_directly_when_the_default_partition_has_no_rows_for_it(monkeypatch):
+    monkeypatch.setattr(partitioning, "list_partitions", lambda conn: ["purchases_default"])
+    conn = RecordingConnection(default_has_rows=False)
+
+    ensure_partitions(conn, months_ahead=0, today=date(2026, 10, 18))
+
+    assert conn.statements[-1] == partition_ddl(date(2026, 10, 1))
+    assert not any("DELETE" in sql for sql in conn.statements)
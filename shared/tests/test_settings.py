@@ -0,0 +1,47 @@
+from sqlalchemy.pool import NullPool
+
+from shared.settings import DatabaseSettings
+
+
+def test_compose_style_url_gets_explicit_drivers():
+    s = DatabaseSettings({"DATABASE_URL": "postgres://postgres:postgres@db:5432/supermarket"})
+    assert s.url == "postgresql+psycopg2://postgres:postgres@db:5432/supermarket"
+    assert s.async_url == "postgresql+asyncpg://postgres:postgres@db:5432/supermarket"
+
+
+def test_pool_settings_are_read_from_environment():
+    s = DatabaseSettings({
+        "DATABASE_URL": "postgresql://u:p@h/d",
+        "DB_POOL_SIZE": "20",
+        "DB_MAX_OVERFLOW": "0",
+        "DB_POOL_PRE_PING": "false",
+        "DB_STATEMENT_TIMEOUT_MS": "5000",
+    })
+    kwargs = s.engine_kwargs()
+    assert kwargs["pool_size"] == 20
+    assert kwargs["max_overflow"] == 0
+    assert kwargs["pool_pre_ping"] is False
+    assert kwargs["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert s.engine_kwargs(is_async=True)["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+
+def test_pgbouncer_mode_disables_pooling_and_prepared_statements():
+    s = DatabaseSettings({"DATABASE_URL": "postgresql://u:p@h/d", "DB_PGBOUNCER": "1"})
+    kwargs = s.engine_kwargs(is_async=True)
+    assert kwargs["poolclass"] is NullPool
+    assert "pool_size" not in kwargs
+    assert kwargs["connect_args"]["statement_cache_size"] == 0
+
+
+def test_sqlite_gets_no_pool_arguments():
+    s = DatabaseSettings({"DATABASE_URL": "sqlite:///:memory:"})
+    assert s.engine_kwargs() == {"echo": False}
+    assert s.async_url == "sqlite+aiosqlite:///:memory:"
+
+
+def test_maintenance_engine_has_no_statement_timeout_or_pool():
+    s = DatabaseSettings({"DATABASE_URL": "postgresql://u:p@h/d", "DB_STATEMENT_TIMEOUT_MS": "5000"})
+    kwargs = s.engine_kwargs(maintenance=True)
+    assert kwargs["poolclass"] is NullPool
+    assert "pool_size" not in kwargs
+    assert kwargs["connect_args"] == {"options": "-c statement_timeout=0"}
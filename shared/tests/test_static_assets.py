@@ -0,0 +1,50 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from shared.static_assets import StaticAssets, IMMUTABLE
+
+
+def make_client(tmp_path):
+    (tmp_path / "index.html").write_text('<link href="/static/app.css"><script src="/static/app.js"></script>')
+    (tmp_path / "app.js").write_text("console.log('hi');\n" * 200)
+    (tmp_path / "app.css").write_text("body { margin: 0; }\n")
+    assets = StaticAssets(str(tmp_path))
+    app = FastAPI()
+    app.mount("/static", assets.app)
+
+    @app.get("/ui")
+    def ui(request: Request):
+        return assets.index_response(request)
+
+    return assets, TestClient(app)
+
+
+def test_index_references_hashed_names(tmp_path):
+    assets, client = make_client(tmp_path)
+    html = client.get("/ui").text
+
+    for name in ("app.js", "app.css"):
+        hashed = assets.hashed_names[name]
+        assert hashed != name
+        assert f"/static/{hashed}" in html
+
+
+def test_hashed_assets_are_immutable_and_compressed(tmp_path):
+    assets, client = make_client(tmp_path)
+    response = client.get(f"/static/{assets.hashed_names['app.js']}", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text.startswith("console.log")
+
+
+def test_unchanged_index_is_revalidated_with_304(tmp_path):
+    _, client = make_client(tmp_path)
+    etag = client.get("/ui").headers["etag"]
+
+    response = client.get("/ui", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert client.get("/static/missing.js").status_code == 404